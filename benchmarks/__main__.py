@@ -0,0 +1,129 @@
+__doc__ = """
+Run the benchmarks and write their results as JSON:
+
+    python -m benchmarks --output results.json
+
+Compare them with those of a previous release, failing when a benchmark got
+slower than the threshold:
+
+    python -m benchmarks --baseline previous.json --threshold 0.2
+"""
+import argparse
+from datetime import datetime, timezone
+import json
+import logging
+import platform
+import sys
+from typing import Any, Dict, List, Tuple
+
+from chaoslib import __version__ as chaoslib_version
+
+from chaosaddons import __version__
+
+from .suite import BENCHMARKS, Result, run_benchmarks
+
+RESULTS_FORMAT = 1
+# the larger the better for these units
+THROUGHPUT_UNITS = ("ticks/second",)
+
+
+def result_key(result: Result) -> Tuple[str, str]:
+    return result["name"], json.dumps(result["params"], sort_keys=True)
+
+
+def compare(
+    results: List[Result], baseline: List[Result], threshold: float
+) -> List[str]:
+    """
+    Print how each result changed since the baseline, returns the
+    regressions beyond the threshold.
+    """
+    previous = {result_key(r): r for r in baseline}
+    regressions = []
+    for result in results:
+        key = result_key(result)
+        before = previous.get(key)
+        if before is None or not before["median"]:
+            continue
+
+        change = (result["median"] - before["median"]) / before["median"]
+        if result["unit"] in THROUGHPUT_UNITS:
+            change = -change
+        line = "{} {}: {:+.1%}".format(key[0], key[1], change)
+        print(line, file=sys.stderr)
+        if change > threshold:
+            regressions.append(line)
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description=__doc__
+    )
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="smaller sizes and fewer rounds, to check the suite runs",
+    )
+    parser.add_argument(
+        "--only",
+        action="append",
+        choices=sorted(BENCHMARKS),
+        help="only run this benchmark, can be repeated",
+    )
+    parser.add_argument(
+        "--output", help="file to write the results to, stdout by default"
+    )
+    parser.add_argument(
+        "--baseline", help="results of a previous run to compare with"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="relative slowdown of a median considered a regression",
+    )
+    args = parser.parse_args(argv)
+
+    # safeguards triggered on purpose would otherwise log to stderr
+    logging.getLogger("chaostoolkit").addHandler(logging.NullHandler())
+    logging.getLogger("chaostoolkit").propagate = False
+
+    report: Dict[str, Any] = {
+        "format": RESULTS_FORMAT,
+        "chaosaddons": __version__,
+        "chaoslib": chaoslib_version,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "date": datetime.now(timezone.utc).isoformat(),
+        "quick": args.quick,
+        "results": run_benchmarks(quick=args.quick, only=args.only),
+    }
+
+    data = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(data + "\n")
+    else:
+        print(data)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(
+            report["results"], baseline.get("results", []), args.threshold
+        )
+        if regressions:
+            print(
+                "{} regressions beyond {:.0%}".format(
+                    len(regressions), args.threshold
+                ),
+                file=sys.stderr,
+            )
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
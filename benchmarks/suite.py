@@ -0,0 +1,353 @@
+__doc__ = """
+Benchmarks of the addons, run offline against synthetic safeguards and
+experiments.
+
+Each benchmark returns a list of results, one per set of parameters. A
+result holds the statistics of the samples it measured, in its `unit`.
+"""
+from functools import partial
+import gc
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from chaosaddons.controls import bypass
+from chaosaddons.controls.repeat import repeat_activity
+from chaosaddons.controls.safeguards import (
+    Guardian,
+    probe_executions,
+    scheduling_lag,
+)
+
+__all__ = ["BENCHMARKS", "run_benchmarks"]
+
+Result = Dict[str, Any]
+
+IMPORTED_MODULES = (
+    "chaosaddons",
+    "chaosaddons.controls.bypass",
+    "chaosaddons.controls.cancellation",
+    "chaosaddons.controls.journal",
+    "chaosaddons.controls.limits",
+    "chaosaddons.controls.metrics",
+    "chaosaddons.controls.parallel",
+    "chaosaddons.controls.profiling",
+    "chaosaddons.controls.repeat",
+    "chaosaddons.controls.replay",
+    "chaosaddons.controls.safeguards",
+    "chaosaddons.controls.tracing",
+    "chaosaddons.controls.warmup",
+    "chaosaddons.probes.host",
+    "chaosaddons.utils.idle",
+)
+# chaostoolkit has loaded chaoslib by the time it loads a control
+IMPORT_SCRIPT = """
+import time
+import chaoslib.types
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+
+def summarize(
+    name: str, params: Dict[str, Any], unit: str, samples: List[float]
+) -> Result:
+    ordered = sorted(samples)
+    return {
+        "name": name,
+        "params": params,
+        "unit": unit,
+        "samples": len(ordered),
+        "min": ordered[0],
+        "median": statistics.median(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1],
+        "mean": statistics.fmean(ordered),
+    }
+
+
+def timed(func: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def make_probe(name: str, **properties) -> Dict[str, Any]:
+    """
+    A synthetic safeguard probe, as cheap as a probe can be
+    """
+    probe = {
+        "name": name,
+        "type": "probe",
+        "provider": {
+            "type": "python",
+            "module": "os.path",
+            "func": "exists",
+            "arguments": {"path": "/"},
+        },
+        "tolerance": True,
+    }
+    probe.update(properties)
+    return probe
+
+
+def make_activities(count: int) -> List[Dict[str, Any]]:
+    activities = []
+    for i in range(count):
+        activities.append(
+            {
+                "name": "activity-{}".format(i),
+                "type": "action" if i % 2 else "probe",
+                "tags": ["group-{}".format(i % 10)],
+                "provider": {
+                    "type": "python",
+                    "module": "chaosbench.module{}".format(i % 20),
+                    "func": "func{}".format(i % 7),
+                },
+            }
+        )
+    return activities
+
+
+class ExitRecorder(Guardian):
+    """
+    A guardian recording when it would make the experiment exit, rather
+    than signalling the process
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.exited = threading.Event()
+        self.exited_at = None
+
+    def _exit(self) -> None:
+        self.exited_at = time.perf_counter()
+        self.exited.set()
+
+
+def decide(activities: List[Dict[str, Any]], selectors: Dict[str, Any]):
+    for a in activities:
+        bypass.before_activity_control(a, **selectors)
+        bypass.after_activity_control(a, **selectors)
+
+
+def start(guard: Guardian, probes: List[Dict[str, Any]]) -> None:
+    guard.prepare(probes)
+    guard.run({}, probes, {}, {}, {})
+
+
+###############################################################################
+# Benchmarks
+###############################################################################
+def bench_guardian_lifecycle(quick: bool) -> List[Result]:
+    """
+    Time to start the guardian with N safeguards, until the experiment can
+    carry on, and to terminate it.
+    """
+    results = []
+    rounds = 3 if quick else 10
+    sizes = (1, 10) if quick else (10, 100, 250)
+    for kind in ("now", "repeating"):
+        for size in sizes:
+            startup, terminate = [], []
+            for _ in range(rounds):
+                properties = {"frequency": 1} if kind == "repeating" else {}
+                probes = [
+                    make_probe("safeguard-{}".format(i), **properties)
+                    for i in range(size)
+                ]
+                guard = ExitRecorder()
+
+                startup.append(timed(partial(start, guard, probes)))
+                terminate.append(timed(guard.terminate))
+            params = {"safeguards": size, "kind": kind}
+            results.append(
+                summarize("guardian.startup", params, "seconds", startup)
+            )
+            results.append(
+                summarize("guardian.terminate", params, "seconds", terminate)
+            )
+    return results
+
+
+def bench_guardian_ticks(quick: bool) -> List[Result]:
+    """
+    Executions per second of N repeating safeguards due every 10ms, and the
+    delay between the time each was due and its execution.
+    """
+    results = []
+    duration = 0.2 if quick else 2.0
+    frequency = 0.01
+    sizes = (1, 10) if quick else (1, 10, 100)
+    for size in sizes:
+        names = [
+            "tick-{}-{}-{}".format(size, i, time.monotonic_ns())
+            for i in range(size)
+        ]
+        probes = [make_probe(n, frequency=frequency) for n in names]
+        guard = ExitRecorder()
+        start(guard, probes)
+        time.sleep(duration)
+        guard.terminate()
+
+        ticks = sum(
+            probe_executions.labels(n, "succeeded").value for n in names
+        )
+        lags = []
+        for n in names:
+            counts, total = scheduling_lag.labels(n).snapshot()
+            if sum(counts):
+                lags.append(total / sum(counts))
+        params = {"safeguards": size, "frequency": frequency}
+        results.append(
+            summarize(
+                "guardian.tick_throughput",
+                params,
+                "ticks/second",
+                [ticks / duration],
+            )
+        )
+        if lags:
+            results.append(
+                summarize("guardian.scheduling_lag", params, "seconds", lags)
+            )
+    return results
+
+
+def bench_trigger_to_exit(quick: bool) -> List[Result]:
+    """
+    Delay between a safeguard not meeting its tolerance and the guardian
+    telling the experiment to exit.
+    """
+    samples = []
+    for i in range(5 if quick else 50):
+        probe = make_probe("trigger-{}".format(i), background=True)
+        probe["tolerance"] = False
+        guard = ExitRecorder()
+        start(guard, [probe])
+        if guard.exited.wait(timeout=5):
+            samples.append(guard.exited_at - guard.triggered_at)
+        guard.terminate()
+    return [summarize("guardian.trigger_to_exit", {}, "seconds", samples)]
+
+
+def bench_repeat_expansion(quick: bool) -> List[Result]:
+    """
+    Time to insert n copies of an activity in the middle of k activities
+    """
+    results = []
+    rounds = 3 if quick else 10
+    counts = (10, 100) if quick else (10, 100, 1000)
+    sizes = (10, 100) if quick else (10, 1000, 10000)
+    for n in counts:
+        for k in sizes:
+            samples = []
+            for _ in range(rounds):
+                activities = make_activities(k)
+                activity = activities[k // 2]
+                samples.append(
+                    timed(partial(repeat_activity, activity, activities, n))
+                )
+            results.append(
+                summarize(
+                    "repeat.expansion",
+                    {"repeat_count": n, "activities": k},
+                    "seconds",
+                    samples,
+                )
+            )
+    return results
+
+
+def bench_bypass_matching(quick: bool) -> List[Result]:
+    """
+    Time for the bypass control to decide for every activity of a large
+    experiment, once its selectors are compiled at the start of the
+    experiment (cold) and then once its decisions are remembered (warm).
+    """
+    results = []
+    rounds = 3 if quick else 10
+    selectors = {
+        "target_names": ["activity-{}".format(i) for i in range(0, 1000, 7)],
+        "target_patterns": ["activity-1*5"],
+        "target_regexes": ["^activity-[0-9]+3$"],
+        "target_providers": [
+            {"type": "python", "module": "chaosbench.module3"}
+        ],
+        "target_tags": ["group-4"],
+    }
+    for size in (100, 1000) if quick else (1000, 10000):
+        activities = make_activities(size)
+        cold, warm = [], []
+        for _ in range(rounds):
+            bypass.after_experiment_control()
+            bypass.before_experiment_control(context={}, **selectors)
+
+            cold.append(timed(partial(decide, activities, selectors)))
+            warm.append(timed(partial(decide, activities, selectors)))
+        bypass.after_experiment_control()
+        params = {"activities": size}
+        results.append(
+            summarize("bypass.matching.cold", params, "seconds", cold)
+        )
+        results.append(
+            summarize("bypass.matching.warm", params, "seconds", warm)
+        )
+    return results
+
+
+def bench_import_time(quick: bool) -> List[Result]:
+    """
+    Time to import each module in a fresh interpreter, as each chaostoolkit
+    process does. The first import of each module compiles it and is not
+    measured.
+    """
+    results = []
+    rounds = 3 if quick else 20
+    modules = ("chaosaddons", "chaosaddons.controls.safeguards")
+    with tempfile.TemporaryDirectory() as cache:
+        env = dict(os.environ, PYTHONPYCACHEPREFIX=cache)
+        env.pop("PYTHONDONTWRITEBYTECODE", None)
+        for module in modules if quick else IMPORTED_MODULES:
+            script = IMPORT_SCRIPT.format(module=module)
+            samples = []
+            for i in range(rounds + 1):
+                proc = subprocess.run(
+                    [sys.executable, "-c", script],
+                    env=env,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                )
+                if i:
+                    samples.append(float(proc.stdout))
+            results.append(
+                summarize("import_time", {"module": module}, "seconds", samples)
+            )
+    return results
+
+
+BENCHMARKS = {
+    "import_time": bench_import_time,
+    "guardian.lifecycle": bench_guardian_lifecycle,
+    "guardian.ticks": bench_guardian_ticks,
+    "guardian.trigger_to_exit": bench_trigger_to_exit,
+    "repeat.expansion": bench_repeat_expansion,
+    "bypass.matching": bench_bypass_matching,
+}
+
+
+def run_benchmarks(quick: bool = False, only: List[str] = None) -> List[Result]:
+    results = []
+    for name, bench in BENCHMARKS.items():
+        if only and not any(name.startswith(o) for o in only):
+            continue
+        gc.collect()
+        results.extend(bench(quick))
+    return results
@@ -1,12 +1,21 @@
-try:
-    from importlib.metadata import version, PackageNotFoundError
-except ImportError:
-    from importlib_metadata import version, PackageNotFoundError
-
 __all__ = ["__version__"]
 
 
-try:
-    __version__ = version("chaostoolkit-addons")
-except PackageNotFoundError:  # pragma: no cover
-    __version__ = "unknown"
+def __getattr__(name: str) -> str:
+    # resolved on first access, importlib.metadata is slow to import
+    if name != "__version__":
+        raise AttributeError(
+            "module {!r} has no attribute {!r}".format(__name__, name)
+        )
+
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+    except ImportError:
+        from importlib_metadata import PackageNotFoundError, version
+
+    try:
+        value = version("chaostoolkit-addons")
+    except PackageNotFoundError:  # pragma: no cover
+        value = "unknown"
+    globals()["__version__"] = value
+    return value
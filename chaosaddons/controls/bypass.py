@@ -39,24 +39,190 @@ For instance, to bypass the execution of all actions in the experiment:
         }
     ],
 ```
+
+Activities can also be selected with glob patterns, regular expressions,
+their provider or their tags. An activity is bypassed as soon as any of the
+selectors matches it:
+
+```json
+"controls": [
+        {
+            "name": "bypass-actions",
+            "provider": {
+                "type": "python",
+                "module": "chaosaddons.controls.bypass",
+                "arguments": {
+                    "target_patterns": ["restart-*"],
+                    "target_regexes": ["^drain-node-[0-9]+$"],
+                    "target_providers": [
+                        {"type": "python", "module": "chaosk8s.node.actions"},
+                        {"type": "process"}
+                    ],
+                    "target_tags": ["production-unsafe"]
+                }
+            }
+        }
+    ],
+```
+
+A provider selector matches when all the keys it declares (`type`, `module`,
+`func`, `path` or `url`) equal the activity's provider ones. Tags are read
+from the activity's `tags` property. Regular expressions must match the whole
+activity name and may set inline flags, such as `(?i)`.
+
+Selectors are compiled once, when the experiment starts, and the decision
+for each activity is remembered so the activity hooks do not walk the
+selectors again. The control may be declared several times, globally, in
+the experiment or on activities, each declaration compiling its own
+selectors.
 """
+import fnmatch
 import logging
-from typing import List
+import re
+from typing import Any, Dict, List, Optional, Tuple
 
-from chaoslib.types import Activity
+from chaoslib.exceptions import InvalidActivity
+from chaoslib.types import Activity, Control, Experiment
 
 
 __all__ = [
+    "validate_control",
     "before_experiment_control",
+    "after_experiment_control",
     "before_activity_control",
     "after_activity_control",
 ]
 logger = logging.getLogger("chaostoolkit")
 
+PROVIDER_KEYS = ("type", "module", "func", "path", "url")
+
+
+class Selector:
+    """
+    Compiled form of the bypass selectors.
+
+    Exact names, provider selectors and tags are looked up in hashed sets
+    while glob patterns and regular expressions are folded into a single
+    alternation so the regex engine walks the name only once. Regular
+    expressions that cannot be folded, such as those with groups or setting
+    global inline flags, are matched one by one instead.
+
+    Raises `re.error` when one of the regular expressions is invalid.
+    """
+
+    def __init__(
+        self,
+        target_type: str = None,
+        target_names: List[str] = None,
+        target_patterns: List[str] = None,
+        target_regexes: List[str] = None,
+        target_providers: List[Dict[str, str]] = None,
+        target_tags: List[str] = None,
+    ) -> None:
+        self.target_type = target_type
+        self.names = frozenset(target_names or [])
+        self.tags = frozenset(target_tags or [])
+
+        expressions = [fnmatch.translate(p) for p in target_patterns or []]
+        expressions.extend(target_regexes or [])
+        # compiled on their own first, so an invalid one is reported as is
+        self.expressions = []
+        foldable = []
+        for e in expressions:
+            compiled = re.compile(e)
+            # groups would be renumbered, or clash, once folded
+            if compiled.groups == 0 and can_be_folded(e):
+                foldable.append(e)
+            else:
+                self.expressions.append(compiled)
+        if foldable:
+            self.expressions.insert(
+                0, re.compile("|".join("(?:{})".format(e) for e in foldable))
+            )
+
+        # each provider selector only constrains the keys it declares, so
+        # we index them by that set of keys (their mask) and, at match time,
+        # project the activity's provider through each known mask
+        masks = set()
+        providers = set()
+        for p in target_providers or []:
+            mask = tuple(k for k in PROVIDER_KEYS if k in p)
+            masks.add(mask)
+            providers.add(provider_key(p, masked=mask))
+        self.provider_masks = frozenset(masks)
+        self.providers = frozenset(providers)
+
+        self._decisions: Dict[int, Tuple[Activity, bool]] = {}
+
+    def matches(self, activity: Activity) -> bool:
+        """
+        Tell if the activity is targeted by any of the selectors.
+
+        The decision is remembered against the activity itself so it is
+        computed only once per activity, no matter how many hooks ask.
+        """
+        key = id(activity)
+        decision = self._decisions.get(key)
+        if decision is not None and decision[0] is activity:
+            return decision[1]
+
+        matched = self._match(activity)
+        # we keep a reference to the activity so its id cannot be recycled
+        self._decisions[key] = (activity, matched)
+        return matched
+
+    def _match(self, activity: Activity) -> bool:
+        if self.target_type and activity.get("type") == self.target_type:
+            return True
+
+        name = activity.get("name")
+        if name is not None:
+            if name in self.names:
+                return True
+            for expression in self.expressions:
+                if expression.fullmatch(name):
+                    return True
+
+        if self.tags and not self.tags.isdisjoint(activity.get("tags") or []):
+            return True
+
+        if self.providers:
+            provider = activity.get("provider") or {}
+            for mask in self.provider_masks:
+                if provider_key(provider, masked=mask) in self.providers:
+                    return True
+
+        return False
+
+
+# compiled selectors, by the arguments of the control declaring them
+_selectors: Dict[Tuple, Selector] = {}
+
+
+def validate_control(control: Control) -> None:
+    arguments = control["provider"].get("arguments") or {}
+    for regex in arguments.get("target_regexes") or []:
+        try:
+            re.compile(regex)
+        except re.error as x:
+            raise InvalidActivity(
+                "bypass control regex '{}' is invalid: {}".format(regex, x)
+            )
+
 
 def before_experiment_control(
-    target_type: str = None, target_names: List[str] = None, **kwargs
+    context: Experiment = None,
+    target_type: str = None,
+    target_names: List[str] = None,
+    target_patterns: List[str] = None,
+    target_regexes: List[str] = None,
+    target_providers: List[Dict[str, str]] = None,
+    target_tags: List[str] = None,
+    **kwargs,
 ):
+    """
+    Compile the selectors once for the whole experiment
+    """
     if target_type:
         logger.warning(
             "No '{}' will be executed as configured by the bypass "
@@ -68,27 +234,144 @@ def before_experiment_control(
                 ", ".join(target_names)
             )
         )
+    for label, selectors in (
+        ("patterns", target_patterns),
+        ("regexes", target_regexes),
+        ("tags", target_tags),
+    ):
+        if selectors:
+            logger.warning(
+                "Activities matching the following {} will not be "
+                "executed: {}".format(label, ", ".join(selectors))
+            )
+    if target_providers:
+        logger.warning(
+            "Activities with the following providers will not be "
+            "executed: {}".format(
+                ", ".join(
+                    "/".join(str(v) for v in p.values())
+                    for p in target_providers
+                )
+            )
+        )
+
+    get_selector(
+        target_type,
+        target_names,
+        target_patterns,
+        target_regexes,
+        target_providers,
+        target_tags,
+    )
+
+
+def after_experiment_control(**kwargs):
+    """
+    Drop the compiled selectors and the decisions they remembered
+    """
+    _selectors.clear()
 
 
 def before_activity_control(
-    context: Activity, target_type: str = None, target_names: List[str] = None
+    context: Activity,
+    target_type: str = None,
+    target_names: List[str] = None,
+    target_patterns: List[str] = None,
+    target_regexes: List[str] = None,
+    target_providers: List[Dict[str, str]] = None,
+    target_tags: List[str] = None,
 ):
     """
     Sets the `dry` property on the activity so it is not actually executed
     """
-    if target_type and context["type"] == target_type:
-        context["dry"] = True
-    if target_names and context["name"] in target_names:
+    selector = get_selector(
+        target_type,
+        target_names,
+        target_patterns,
+        target_regexes,
+        target_providers,
+        target_tags,
+    )
+    if selector.matches(context):
         context["dry"] = True
 
 
 def after_activity_control(
-    context: Activity, target_type: str = None, target_names: List[str] = None
+    context: Activity,
+    target_type: str = None,
+    target_names: List[str] = None,
+    target_patterns: List[str] = None,
+    target_regexes: List[str] = None,
+    target_providers: List[Dict[str, str]] = None,
+    target_tags: List[str] = None,
 ):
     """
     Removes the `dry` property that was previously set
     """
-    if target_type and context["type"] == target_type:
-        context.pop("dry", None)
-    if target_names and context["name"] in target_names:
+    selector = get_selector(
+        target_type,
+        target_names,
+        target_patterns,
+        target_regexes,
+        target_providers,
+        target_tags,
+    )
+    if selector.matches(context):
         context.pop("dry", None)
+
+
+###############################################################################
+# Internals
+###############################################################################
+def get_selector(
+    target_type: str = None,
+    target_names: List[str] = None,
+    target_patterns: List[str] = None,
+    target_regexes: List[str] = None,
+    target_providers: List[Dict[str, str]] = None,
+    target_tags: List[str] = None,
+) -> Selector:
+    """
+    Return the compiled selector for these arguments, compiling it only the
+    first time they are seen: when the experiment starts or, for controls
+    declared on activities, on their first hook.
+
+    The control's arguments are handed to us as fresh copies on each call
+    so we index the compiled selectors by their value rather than identity.
+    """
+    key = (
+        target_type,
+        tuple(target_names or ()),
+        tuple(target_patterns or ()),
+        tuple(target_regexes or ()),
+        tuple(
+            provider_key(p, masked=PROVIDER_KEYS)
+            for p in target_providers or ()
+        ),
+        tuple(target_tags or ()),
+    )
+    selector = _selectors.get(key)
+    if selector is None:
+        selector = _selectors[key] = Selector(
+            target_type,
+            target_names,
+            target_patterns,
+            target_regexes,
+            target_providers,
+            target_tags,
+        )
+    return selector
+
+
+def can_be_folded(expression: str) -> bool:
+    try:
+        re.compile("(?:{})".format(expression))
+    except re.error:
+        return False
+    return True
+
+
+def provider_key(
+    provider: Dict[str, Any], masked: Tuple[str, ...]
+) -> Tuple[Tuple[str, Optional[str]], ...]:
+    return tuple((k, provider.get(k)) for k in masked)
@@ -0,0 +1,483 @@
+__doc__ = """
+Cancels the activities still running when a safeguard interrupts the
+experiment, rather than waiting for them to return on their own.
+
+```json
+"controls": [
+        {
+            "name": "cancellation",
+            "provider": {
+                "type": "python",
+                "module": "chaosaddons.controls.cancellation",
+                "arguments": {
+                    "grace_period": 5
+                }
+            }
+        }
+    ],
+```
+
+How an activity is cancelled depends on its provider:
+
+* a process provider is started in its own process group. The whole group is
+  sent `SIGTERM` and, if it is still around `grace_period` seconds later,
+  `SIGKILL`, so the tools the process spawned are stopped as well
+* an HTTP provider call is abandoned: the activity fails immediately while
+  the request completes, or times out, in a background thread
+* a Python provider is given a cancellation token it can poll:
+
+```python
+from chaosaddons.controls.cancellation import current_token
+
+def generate_load(duration: int):
+    token = current_token()
+    deadline = time.monotonic() + duration
+    while not token.cancelled and time.monotonic() < deadline:
+        send_request()
+        token.wait(0.1)
+```
+
+Cancelled activities fail and their run reports, under the `cancelled` key,
+why they were cancelled and how long they took to stop once the safeguard
+triggered. That delay is also exposed by the `metrics` control.
+
+Rollbacks are never cancelled. This control must be declared at the
+experiment level, or globally, along with the safeguards.
+"""
+import itertools
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from chaoslib import decode_bytes, substitute
+from chaoslib.exceptions import ActivityFailed
+from chaoslib.types import Activity, Configuration, Experiment, Run, Secrets
+
+from .metrics import registry
+from .synchronization import in_safeguard, restore_provider, swap_provider
+
+__all__ = [
+    "before_experiment_control",
+    "after_experiment_control",
+    "before_rollback_control",
+    "before_activity_control",
+    "after_activity_control",
+    "after_method_control",
+    "cancel_running",
+    "current_token",
+    "CancellationToken",
+]
+logger = logging.getLogger("chaostoolkit")
+
+trigger_to_stop = registry.histogram(
+    "chaosaddons_cancellation_trigger_to_stop_seconds",
+    "Delay between a cancellation being triggered and the cancelled activity "
+    "actually stopping",
+)
+
+
+class CancellationToken:
+    """
+    Tells the provider of an activity it has been cancelled
+    """
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str) -> None:
+        self.reason = reason
+        self._event.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Wait for the activity to be cancelled, returns whether it was
+        """
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise ActivityFailed("activity cancelled: {}".format(self.reason))
+
+
+class Running:
+    """
+    An activity currently running, with what it takes to cancel it
+    """
+
+    def __init__(
+        self,
+        activity: Activity,
+        configuration: Configuration,
+        secrets: Secrets,
+        grace_period: float,
+    ) -> None:
+        self.activity = activity
+        self.provider = activity.get("provider", {})
+        # the provider the run of the activity is recorded with, which
+        # this control swapped in for process and HTTP providers
+        self.recorded_provider = self.provider
+        self.swapped = False
+        self.configuration = configuration
+        self.secrets = secrets
+        self.grace_period = grace_period
+        self.token = CancellationToken()
+        self.process: Optional[subprocess.Popen] = None
+        self.wakeup: Optional[threading.Event] = None
+        self.triggered_at: Optional[float] = None
+        self.stopped_after: Optional[float] = None
+        self._lock = threading.Lock()
+        self._terminated = False
+
+    def cancel(self, reason: str, triggered_at: float) -> None:
+        """
+        Flag the activity as cancelled, `stop` then actually stops it
+        """
+        self.triggered_at = triggered_at
+        self.token.cancel(reason)
+
+    def stop(self) -> None:
+        if self.wakeup is not None:
+            self.wakeup.set()
+        if self.process is not None:
+            self.terminate()
+
+    def terminate(self) -> None:
+        """
+        Terminate the process of the activity, only once
+        """
+        with self._lock:
+            if self._terminated:
+                return None
+            self._terminated = True
+        terminate_group(self.process, self.grace_period)
+
+    def stopped(self) -> None:
+        """
+        Record how long the activity took to stop once cancelled
+        """
+        if self.triggered_at is None or self.stopped_after is not None:
+            return None
+        self.stopped_after = time.perf_counter() - self.triggered_at
+        trigger_to_stop.labels().observe(self.stopped_after)
+
+
+_lock = threading.Lock()
+_running: Dict[int, Running] = {}
+# interrupted activities whose run was not handed over to this control
+_unfinished: List[Running] = []
+_local = threading.local()
+_rolling_back = False
+# given to the providers running outside of this control
+_never_cancelled = CancellationToken()
+
+
+def before_experiment_control(context: Experiment, **kwargs) -> None:
+    global _rolling_back
+    _rolling_back = False
+
+
+def before_rollback_control(context: Experiment, **kwargs) -> None:
+    global _rolling_back
+    _rolling_back = True
+
+
+def before_activity_control(
+    context: Activity,
+    configuration: Configuration = None,
+    secrets: Secrets = None,
+    grace_period: float = 5,
+    **kwargs,
+) -> None:
+    """
+    Register the activity so it can be cancelled, swapping process and HTTP
+    providers for cancellable ones.
+    """
+    if in_safeguard() or _rolling_back:
+        return None
+
+    running = Running(context, configuration, secrets, grace_period)
+    provider_type = running.provider.get("type")
+    if provider_type in ("process", "http"):
+        running.recorded_provider = {
+            "type": "python",
+            "module": "chaosaddons.controls.cancellation",
+            "func": "run_{}".format(provider_type),
+        }
+        running.swapped = True
+        swap_provider(context, running.recorded_provider)
+
+    with _lock:
+        _running[id(context)] = running
+    _local.running = running
+
+
+def after_activity_control(
+    context: Activity, state: Run = None, **kwargs
+) -> None:
+    with _lock:
+        running = _running.pop(id(context), None)
+    if running is None:
+        return None
+
+    if getattr(_local, "running", None) is running:
+        _local.running = None
+
+    if running.swapped:
+        restore_provider(context, running.recorded_provider, state)
+    if running.token.cancelled:
+        running.stopped()
+    if state is None:
+        # interrupted, its run is fixed once the method is over
+        with _lock:
+            _unfinished.append(running)
+        return None
+
+    record(running, state)
+
+
+def after_method_control(
+    context: Experiment, state: List[Run] = None, **kwargs
+) -> None:
+    """
+    Fix the runs of the activities interrupted by the exit of the experiment,
+    chaostoolkit recorded them with the provider of this control.
+    """
+    with _lock:
+        unfinished = {id(r.recorded_provider): r for r in _unfinished}
+        _unfinished.clear()
+    for run in state or []:
+        provider = run.get("activity", {}).get("provider")
+        running = unfinished.get(id(provider))
+        if running is not None and provider is running.recorded_provider:
+            record(running, run)
+
+
+def after_experiment_control(**kwargs) -> None:
+    """
+    Put back the providers of the activities that never completed, such as
+    those interrupted by the exit of the experiment.
+    """
+    with _lock:
+        running = list(_running.values())
+        _running.clear()
+        _unfinished.clear()
+    for r in running:
+        if r.swapped:
+            restore_provider(r.activity, r.recorded_provider)
+
+
+def cancel_running(
+    reason: str,
+    triggered_at: float = None,
+    before_stopping: Callable[[], None] = None,
+) -> int:
+    """
+    Cancel all the activities currently running, returns how many were.
+
+    `triggered_at` is the `time.perf_counter()` time of the event that led to
+    the cancellation, now by default. `before_stopping` is called once the
+    activities know they are cancelled but before they are stopped, to exit
+    the experiment for instance.
+    """
+    if triggered_at is None:
+        triggered_at = time.perf_counter()
+
+    with _lock:
+        running = list(_running.values())
+
+    for r in running:
+        logger.debug(
+            "Cancelling activity '{}': {}".format(
+                r.activity.get("name"), reason
+            )
+        )
+        r.cancel(reason, triggered_at)
+    if before_stopping is not None:
+        before_stopping()
+    for r in running:
+        r.stop()
+    return len(running)
+
+
+def current_token() -> CancellationToken:
+    """
+    Cancellation token of the activity running in the current thread
+    """
+    running = getattr(_local, "running", None)
+    if running is None:
+        return _never_cancelled
+    return running.token
+
+
+def run_process() -> Dict[str, Any]:
+    """
+    Provider function of the process activities: runs the process in its own
+    process group so it can be terminated with all its children.
+    """
+    running = current_running()
+    provider = running.provider
+    arguments = process_arguments(
+        provider, running.configuration, running.secrets
+    )
+    shell = isinstance(arguments, str)
+
+    logger.debug("Running: {}".format(str(arguments)))
+    proc = subprocess.Popen(
+        arguments,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=os.environ,
+        shell=shell,
+        start_new_session=True,
+    )
+    running.process = proc
+    if running.token.cancelled:
+        running.terminate()
+
+    try:
+        stdout, stderr = proc.communicate(timeout=provider.get("timeout"))
+    except subprocess.TimeoutExpired:
+        kill_group(proc)
+        proc.communicate()
+        raise ActivityFailed("process activity took too long to complete")
+    except BaseException:
+        # such as the exit of the experiment raised in the main thread
+        running.terminate()
+        proc.wait()
+        running.stopped()
+        raise
+
+    running.token.raise_if_cancelled()
+
+    if "tolerance" not in running.activity and proc.returncode > 0:
+        logger.warning(
+            "This process returned a non-zero exit code. "
+            "This may indicate some error and not what you expected. "
+            "Please have a look at the logs."
+        )
+
+    return {
+        "status": proc.returncode,
+        "stdout": decode_bytes(stdout),
+        "stderr": decode_bytes(stderr),
+    }
+
+
+def run_http() -> Any:
+    """
+    Provider function of the HTTP activities: makes the call in a background
+    thread so the activity can give up on it as soon as it is cancelled.
+    """
+    from chaoslib.provider.http import run_http_activity
+
+    running = current_running()
+    activity = dict(running.activity, provider=running.provider)
+    outcome = {}
+    running.wakeup = done = threading.Event()
+
+    def call() -> None:
+        try:
+            outcome["output"] = run_http_activity(
+                activity, running.configuration, running.secrets
+            )
+        except Exception as x:
+            outcome["error"] = x
+        finally:
+            done.set()
+
+    threading.Thread(
+        target=call, name="chaosaddons-cancellation-http", daemon=True
+    ).start()
+    if running.token.cancelled:
+        done.set()
+    done.wait()
+
+    running.token.raise_if_cancelled()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["output"]
+
+
+###############################################################################
+# Internals
+###############################################################################
+def record(running: Running, run: Run) -> None:
+    """
+    Put the original provider back in the run of the activity and tell why it
+    was cancelled
+    """
+    activity = run.get("activity", {})
+    if (
+        running.swapped
+        and activity.get("provider") is running.recorded_provider
+    ):
+        activity["provider"] = running.provider
+    if running.token.cancelled:
+        run["cancelled"] = {
+            "reason": running.token.reason,
+            "stopped_after": running.stopped_after,
+        }
+
+
+def current_running() -> Running:
+    running = getattr(_local, "running", None)
+    if running is None:
+        raise ActivityFailed(
+            "activity is not registered with the cancellation control"
+        )
+    return running
+
+
+def process_arguments(
+    provider: Dict[str, Any], configuration: Configuration, secrets: Secrets
+) -> Any:
+    """
+    Command line of a process provider, built the way chaostoolkit does
+    """
+    arguments = provider.get("arguments", [])
+    if arguments and (configuration or secrets):
+        arguments = substitute(arguments, configuration, secrets)
+
+    path = shutil.which(os.path.expanduser(provider["path"]))
+    if isinstance(arguments, str):
+        return "{} {}".format(path, arguments)
+
+    if isinstance(arguments, dict):
+        arguments = itertools.chain.from_iterable(arguments.items())
+    command: List[str] = [str(p) for p in arguments if p not in (None, "")]
+    command.insert(0, path)
+    return command
+
+
+def terminate_group(proc: subprocess.Popen, grace_period: float) -> None:
+    """
+    Ask the process group to terminate, then kill it after the grace period
+    """
+    signal_group(proc, signal.SIGTERM)
+    timer = threading.Timer(grace_period, kill_group, args=(proc,))
+    timer.daemon = True
+    timer.start()
+
+
+def kill_group(proc: subprocess.Popen) -> None:
+    signal_group(proc, getattr(signal, "SIGKILL", signal.SIGTERM))
+
+
+def signal_group(proc: subprocess.Popen, signum: int) -> None:
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signum)
+        else:
+            proc.send_signal(signum)
+    except (ProcessLookupError, PermissionError):
+        pass
@@ -0,0 +1,226 @@
+__doc__ = """
+Streams the runs of the experiment to a JSON Lines file as they complete, so
+that a long experiment does not lose its history if the process is killed.
+
+```json
+"controls": [
+        {
+            "name": "journal",
+            "provider": {
+                "type": "python",
+                "module": "chaosaddons.controls.journal",
+                "arguments": {
+                    "path": "./journal.jsonl",
+                    "include_safeguards": true,
+                    "drop_persisted_runs": true
+                }
+            }
+        }
+    ],
+```
+
+The file starts with an `experiment-start` record, followed by one `run`
+record per activity, or `safeguard` record per safeguard probe run when
+`include_safeguards` is set, and ends with an `experiment-end` record.
+
+Records are buffered and written in batches of `batch_size` records, or at
+least every `flush_interval` seconds. The file is synced to disk at most
+every `fsync_interval` seconds, and always at the end.
+
+With `drop_persisted_runs`, the runs of the method and rollbacks kept in the
+in-memory journal are reduced to their status and timing once they have been
+written, so the memory used by the journal stays flat however long the
+experiment runs. The JSON Lines file is then the only complete record of
+the experiment.
+"""
+from datetime import datetime, timezone
+import json
+import logging
+import os
+import threading
+import time
+from typing import IO, List, Optional
+
+from chaoslib.types import Activity, Experiment, Journal, Run
+
+from .synchronization import in_safeguard
+
+__all__ = [
+    "before_experiment_control",
+    "after_experiment_control",
+    "after_activity_control",
+]
+logger = logging.getLogger("chaostoolkit")
+
+KEPT_RUN_KEYS = ("status", "start", "end", "duration")
+
+
+class JournalWriter:
+    def __init__(
+        self,
+        path: str,
+        batch_size: int,
+        flush_interval: float,
+        fsync_interval: float,
+        drop_persisted_runs: bool,
+    ) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.drop_persisted_runs = drop_persisted_runs
+        self._lock = threading.Lock()
+        self._buffer: List[str] = []
+        self._persisted: List[Run] = []
+        self._pending: List[Run] = []
+        self._last_fsync = time.monotonic()
+        self._stop = threading.Event()
+        self._file: IO[str] = open(path, "a", encoding="utf-8")
+        self._flusher = threading.Thread(
+            target=self._flush_periodically,
+            name="chaosaddons-journal",
+            daemon=True,
+        )
+        self._flusher.start()
+
+    def write(self, record: dict, run: Run = None) -> None:
+        """
+        Serialize the record now, so it reflects the run as it completed,
+        and buffer it.
+        """
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._buffer.append(line)
+            if run is not None and self.drop_persisted_runs:
+                self._pending.append(run)
+            if len(self._buffer) >= self.batch_size:
+                self._flush()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._flusher.join()
+        with self._lock:
+            self._flush(fsync=True)
+            self._file.close()
+
+    def _flush(self, fsync: bool = False) -> None:
+        if self._buffer:
+            self._file.write("\n".join(self._buffer) + "\n")
+            self._buffer.clear()
+            self._file.flush()
+
+        now = time.monotonic()
+        if fsync or now - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+
+        # runs are reduced one flush later, so controls applied after this
+        # one on the same activity still see the complete run
+        for run in self._persisted:
+            drop_run(run)
+        self._persisted = self._pending
+        self._pending = []
+
+    def _flush_periodically(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            with self._lock:
+                try:
+                    self._flush()
+                except (OSError, ValueError):
+                    logger.debug("Failed to flush the journal", exc_info=True)
+
+
+_writer: Optional[JournalWriter] = None
+
+
+def before_experiment_control(
+    context: Experiment,
+    path: str = "./journal.jsonl",
+    batch_size: int = 32,
+    flush_interval: float = 1.0,
+    fsync_interval: float = 5.0,
+    include_safeguards: bool = False,
+    drop_persisted_runs: bool = False,
+) -> None:
+    global _writer
+    if _writer is not None:
+        _writer.close()
+
+    _writer = JournalWriter(
+        path, batch_size, flush_interval, fsync_interval, drop_persisted_runs
+    )
+    _writer.write(
+        {
+            "type": "experiment-start",
+            "title": context.get("title"),
+            "start": datetime.now(timezone.utc).isoformat(),
+        }
+    )
+
+
+def after_activity_control(
+    context: Activity,
+    experiment: Experiment,
+    state: Run,
+    include_safeguards: bool = False,
+    **kwargs,
+) -> None:
+    writer = _writer
+    if writer is None or state is None:
+        return None
+
+    if in_safeguard():
+        if include_safeguards:
+            writer.write({"type": "safeguard", "run": state})
+        return None
+
+    # steady-state probes are checked against their tolerance once their
+    # controls are applied, so their output must be kept
+    hypothesis = experiment.get("steady-state-hypothesis", {})
+    if any(p is context for p in hypothesis.get("probes", [])):
+        writer.write({"type": "run", "run": state})
+        return None
+
+    writer.write({"type": "run", "run": state}, run=state)
+
+
+def after_experiment_control(
+    context: Experiment, state: Journal = None, **kwargs
+) -> None:
+    global _writer
+    writer = _writer
+    if writer is None:
+        return None
+
+    _writer = None
+    record = {
+        "type": "experiment-end",
+        "end": datetime.now(timezone.utc).isoformat(),
+    }
+    if state is not None:
+        record["status"] = state.get("status")
+        record["deviated"] = state.get("deviated")
+    writer.write(record)
+    try:
+        writer.close()
+    except OSError:
+        logger.warning("Failed to close the journal", exc_info=True)
+
+
+###############################################################################
+# Internals
+###############################################################################
+def drop_run(run: Run) -> None:
+    """
+    Reduce the run, in place, to its activity's name, status and timing
+    """
+    activity = run.get("activity") or {}
+    kept = {k: run[k] for k in KEPT_RUN_KEYS if k in run}
+    run.clear()
+    run.update(kept)
+    run["activity"] = {
+        "name": activity.get("name"),
+        "type": activity.get("type"),
+    }
+    run["output"] = None
+    run["persisted"] = True
@@ -0,0 +1,282 @@
+__doc__ = """
+Limits the rate and concurrency of the activities hitting a shared backend,
+such as a metrics server queried by safeguards, steady-state probes and
+repeated activities alike.
+
+Limits are declared per backend key:
+
+```json
+"controls": [
+        {
+            "name": "limits",
+            "provider": {
+                "type": "python",
+                "module": "chaosaddons.controls.limits",
+                "arguments": {
+                    "limits": {
+                        "prometheus.example.com:9090": {
+                            "rate": 5,
+                            "burst": 10,
+                            "concurrency": 2
+                        },
+                        "chaosprometheus": {
+                            "concurrency": 4,
+                            "max_wait": 10
+                        },
+                        "heavy-queries": {
+                            "rate": 0.5
+                        }
+                    }
+                }
+            }
+        }
+    ],
+```
+
+An activity is bound to the first key matching, in that order, one of its
+`tags`, the host of its HTTP provider's URL or the module of its Python
+provider, or one of that module's parent packages.
+
+Each key has a token bucket, refilled at `rate` activities per second and
+holding up to `burst` tokens (one by default), and a semaphore allowing
+`concurrency` activities to run at once. Either can be left out. An activity
+waits for both, for `max_wait` seconds at most when it is set. Activities
+still waiting past that delay are rejected: they do not run and their run is
+failed. Rejected safeguard probes do not interrupt the experiment.
+
+The limits apply to all activities, including the safeguard probes whose
+provider call is limited directly by the safeguard control.
+
+Waits and rejections are reported in the run of each activity, under the
+`limits` key, and in the metrics exposed by the `metrics` control.
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from chaoslib.exceptions import ActivityFailed
+from chaoslib.types import Activity, Run
+
+from .metrics import registry
+from .synchronization import in_safeguard, restore_provider, swap_provider
+
+__all__ = [
+    "configure_control",
+    "before_activity_control",
+    "after_activity_control",
+    "after_experiment_control",
+    "limiters",
+]
+logger = logging.getLogger("chaostoolkit")
+
+limiter_waits = registry.histogram(
+    "chaosaddons_limiter_wait_seconds",
+    "Time activities waited for their limiter, by backend key",
+    ("key",),
+)
+limiter_rejections = registry.counter(
+    "chaosaddons_limiter_rejections",
+    "Activities rejected by their limiter, by backend key",
+    ("key",),
+)
+
+
+class Limiter:
+    """
+    Token bucket and concurrency semaphore of a backend key.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        rate: float = None,
+        burst: float = 1,
+        concurrency: int = None,
+        max_wait: float = None,
+    ) -> None:
+        self.key = key
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_wait = max_wait
+        self.semaphore = None
+        if concurrency:
+            self.semaphore = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._refilled_at = time.monotonic()
+
+    def acquire(self) -> Optional[float]:
+        """
+        Wait for a token and a slot. Returns how long we waited or `None`
+        when we gave up after `max_wait` seconds.
+        """
+        start = time.monotonic()
+        deadline = None
+        if self.max_wait is not None:
+            deadline = start + self.max_wait
+
+        if self.rate and not self._take_token(deadline):
+            return self._reject()
+
+        if self.semaphore is not None:
+            timeout = None
+            if deadline is not None:
+                timeout = max(0, deadline - time.monotonic())
+            if not self.semaphore.acquire(timeout=timeout):
+                return self._reject()
+
+        waited = time.monotonic() - start
+        limiter_waits.labels(self.key).observe(waited)
+        return waited
+
+    def release(self) -> None:
+        if self.semaphore is not None:
+            self.semaphore.release()
+
+    def _take_token(self, deadline: Optional[float]) -> bool:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst,
+                    self._tokens + (now - self._refilled_at) * self.rate,
+                )
+                self._refilled_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+
+            if deadline is not None:
+                if now + wait > deadline:
+                    return False
+            time.sleep(wait)
+
+    def _reject(self) -> None:
+        limiter_rejections.labels(self.key).inc()
+        logger.warning(
+            "Activity rejected after waiting {}s for the limits of '{}'".format(
+                self.max_wait, self.key
+            )
+        )
+        return None
+
+
+class Limits:
+    def __init__(self) -> None:
+        self.limiters: Dict[str, Limiter] = {}
+
+    def configure(self, limits: Dict[str, Dict[str, Any]]) -> None:
+        self.limiters = {
+            key: Limiter(key, **settings)
+            for key, settings in (limits or {}).items()
+        }
+
+    def resolve(self, activity: Activity) -> Optional[Limiter]:
+        """
+        The limiter bound to the activity, if any
+        """
+        if not self.limiters:
+            return None
+
+        for key in backend_keys(activity):
+            limiter = self.limiters.get(key)
+            if limiter is not None:
+                return limiter
+        return None
+
+
+limiters = Limits()
+
+# limiters held by the activities currently running, with how long they
+# waited for them, and the provider swapped in for those that were rejected
+_held: Dict[int, Tuple[Limiter, float]] = {}
+_rejected: Dict[int, Tuple[Limiter, Dict[str, Any]]] = {}
+
+
+def configure_control(
+    limits: Dict[str, Dict[str, Any]] = None, **kwargs
+) -> None:
+    limiters.configure(limits)
+
+
+def before_activity_control(context: Activity, **kwargs) -> None:
+    """
+    Wait for the activity's limiter. When it is rejected, the activity's
+    provider is swapped for one that fails immediately.
+    """
+    # the safeguard control limits its probes itself
+    if in_safeguard():
+        return None
+
+    limiter = limiters.resolve(context)
+    if limiter is None:
+        return None
+
+    waited = limiter.acquire()
+    if waited is None:
+        stub = {
+            "type": "python",
+            "module": "chaosaddons.controls.limits",
+            "func": "reject",
+            "arguments": {"key": limiter.key},
+        }
+        _rejected[id(context)] = (limiter, stub)
+        swap_provider(context, stub)
+        return None
+
+    _held[id(context)] = (limiter, waited)
+
+
+def after_activity_control(context: Activity, state: Run, **kwargs) -> None:
+    held = _held.pop(id(context), None)
+    if held is not None:
+        limiter, waited = held
+        limiter.release()
+        if state is not None:
+            state["limits"] = {"key": limiter.key, "waited": waited}
+
+    rejected = _rejected.pop(id(context), None)
+    if rejected is not None:
+        limiter, stub = rejected
+        restore_provider(context, stub, state)
+        if state is not None:
+            state["limits"] = {"key": limiter.key, "rejected": True}
+
+
+def after_experiment_control(**kwargs) -> None:
+    limiters.configure({})
+
+
+def reject(key: str) -> None:
+    """
+    Provider function of the activities rejected by their limiter
+    """
+    raise ActivityFailed("activity rejected by the limits of '{}'".format(key))
+
+
+###############################################################################
+# Internals
+###############################################################################
+def backend_keys(activity: Activity) -> List[str]:
+    """
+    Candidate backend keys of the activity, most specific first
+    """
+    keys = list(activity.get("tags") or [])
+    provider = activity.get("provider") or {}
+    provider_type = provider.get("type")
+    if provider_type == "http" and provider.get("url"):
+        try:
+            netloc = urlparse(provider["url"]).netloc
+        except ValueError:
+            netloc = None
+        if netloc:
+            keys.append(netloc)
+            keys.append(netloc.split("@")[-1].split(":")[0])
+    elif provider_type == "python" and provider.get("module"):
+        parts = provider["module"].split(".")
+        for i in range(len(parts), 0, -1):
+            keys.append(".".join(parts[:i]))
+    return keys
@@ -0,0 +1,462 @@
+__doc__ = """
+Exposes metrics about the addons, such as the health of the safeguards, in
+the OpenMetrics text format.
+
+The metrics can be served over HTTP, on localhost by default, so they can be
+scraped during the experiment:
+
+```json
+"controls": [
+        {
+            "name": "metrics",
+            "provider": {
+                "type": "python",
+                "module": "chaosaddons.controls.metrics",
+                "arguments": {
+                    "port": 9464
+                }
+            }
+        }
+    ],
+```
+
+They can also be written periodically to a file, for instance for the
+textfile collector of the Prometheus node exporter:
+
+```json
+"controls": [
+        {
+            "name": "metrics",
+            "provider": {
+                "type": "python",
+                "module": "chaosaddons.controls.metrics",
+                "arguments": {
+                    "textfile": "/var/lib/node_exporter/chaos.prom",
+                    "textfile_interval": 10
+                }
+            }
+        }
+    ],
+```
+
+The file is written one last time when the experiment ends.
+
+Metrics are always collected, whether this control is declared or not. Each
+labelled series has its own lock, so recording a value never contends with
+other series or with the exporter.
+"""
+import bisect
+import logging
+import os
+import os.path
+import tempfile
+import threading
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
+
+if TYPE_CHECKING:
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+__all__ = [
+    "configure_control",
+    "after_experiment_control",
+    "registry",
+]
+logger = logging.getLogger("chaostoolkit")
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+DEFAULT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+class Value:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class HistogramValue:
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self.counts), self.sum
+
+
+class Metric:
+    kind = "unknown"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+
+    def labels(self, *values: str):
+        """
+        Return the series for these label values, creating it the first time
+        """
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        return Value()
+
+    def series(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return list(self._children.items())
+
+    def render(self) -> List[str]:
+        lines = [
+            "# TYPE {} {}".format(self.name, self.kind),
+            "# HELP {} {}".format(self.name, self.documentation),
+        ]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        return [
+            "{}{} {}".format(
+                self.name, format_labels(self.labelnames, values), v.value
+            )
+            for values, v in self.series()
+        ]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _render_samples(self) -> List[str]:
+        return [
+            "{}_total{} {}".format(
+                self.name, format_labels(self.labelnames, values), v.value
+            )
+            for values, v in self.series()
+        ]
+
+
+class Gauge(Metric):
+    """
+    A gauge is either set by the code or, when it's given a callback, read
+    at collection time.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Callable[[], Dict[Tuple[str, ...], float]] = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def _render_samples(self) -> List[str]:
+        if self.callback is None:
+            return super()._render_samples()
+
+        try:
+            values = self.callback()
+        except Exception:
+            logger.debug(
+                "Failed to collect gauge '{}'".format(self.name), exc_info=True
+            )
+            return []
+        return [
+            "{}{} {}".format(
+                self.name, format_labels(self.labelnames, labels), value
+            )
+            for labels, value in values.items()
+        ]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return HistogramValue(self.buckets)
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        bounds = [str(b) for b in self.buckets] + ["+Inf"]
+        for values, h in self.series():
+            counts, total = h.snapshot()
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(
+                    "{}_bucket{} {}".format(
+                        self.name,
+                        format_labels(
+                            self.labelnames + ("le",), values + (bound,)
+                        ),
+                        cumulative,
+                    )
+                )
+            labels = format_labels(self.labelnames, values)
+            lines.append("{}_count{} {}".format(self.name, labels, cumulative))
+            lines.append("{}_sum{} {}".format(self.name, labels, total))
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Metric] = {}
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Callable[[], Dict[Tuple[str, ...], float]] = None,
+    ) -> Gauge:
+        return self._register(
+            Gauge(name, documentation, labelnames, callback=callback)
+        )
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(
+            Histogram(name, documentation, labelnames, buckets=buckets)
+        )
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+
+registry = Registry()
+
+
+def metrics_handler() -> Type["BaseHTTPRequestHandler"]:
+    """
+    The request handler of the metrics endpoint, only defined when we serve
+    it so that importing this module does not import the HTTP server.
+    """
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+
+            data = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format: str, *args) -> None:
+            logger.debug("Metrics endpoint: " + format % args)
+
+    return MetricsHandler
+
+
+class Exporter:
+    def __init__(self) -> None:
+        self.server: Optional["ThreadingHTTPServer"] = None
+        self.textfile: Optional[str] = None
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def serve(self, host: str, port: int) -> None:
+        from http.server import ThreadingHTTPServer
+
+        self.server = ThreadingHTTPServer((host, port), metrics_handler())
+        self.server.daemon_threads = True
+        t = threading.Thread(
+            target=self.server.serve_forever,
+            name="chaosaddons-metrics",
+            daemon=True,
+        )
+        t.start()
+        self._threads.append(t)
+        logger.debug(
+            "Serving metrics on http://{}:{}/metrics".format(
+                host, self.server.server_address[1]
+            )
+        )
+
+    def write_periodically(self, path: str, interval: float) -> None:
+        self.textfile = path
+        t = threading.Thread(
+            target=self._write_loop,
+            args=(interval,),
+            name="chaosaddons-metrics-textfile",
+            daemon=True,
+        )
+        t.start()
+        self._threads.append(t)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        for t in self._threads:
+            t.join()
+        if self.textfile:
+            write_textfile(self.textfile)
+
+    def _write_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            write_textfile(self.textfile)
+
+
+_exporter: Optional[Exporter] = None
+
+
+def configure_control(
+    host: str = "127.0.0.1",
+    port: int = None,
+    textfile: str = None,
+    textfile_interval: float = 10,
+    **kwargs,
+) -> None:
+    """
+    Start serving or writing the metrics
+    """
+    global _exporter
+    if _exporter is not None:
+        _exporter.stop()
+
+    _exporter = Exporter()
+    if port is not None:
+        _exporter.serve(host, port)
+    if textfile:
+        _exporter.write_periodically(textfile, textfile_interval)
+
+
+def after_experiment_control(**kwargs) -> None:
+    """
+    Stop the exporter, writing the metrics one last time to the textfile
+    """
+    global _exporter
+    if _exporter is not None:
+        _exporter.stop()
+        _exporter = None
+
+
+###############################################################################
+# Internals
+###############################################################################
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{{{}}}".format(
+        ",".join(
+            '{}="{}"'.format(n, escape_label(str(v)))
+            for n, v in zip(names, values)
+        )
+    )
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def write_textfile(path: str) -> None:
+    """
+    Write the metrics atomically so collectors never read a partial file
+    """
+    directory = os.path.dirname(path) or "."
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(registry.render())
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        logger.debug("Failed to write metrics textfile", exc_info=True)
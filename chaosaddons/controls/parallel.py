@@ -0,0 +1,336 @@
+__doc__ = """
+Runs groups of consecutive method activities concurrently and waits for the
+whole group to complete before moving on to the next step.
+
+For instance, to inject faults on three targets at once:
+
+```json
+"controls": [
+        {
+            "name": "parallel",
+            "provider": {
+                "type": "python",
+                "module": "chaosaddons.controls.parallel",
+                "arguments": {
+                    "groups": {
+                        "inject-faults": [
+                            "stop-node-a",
+                            "stop-node-b",
+                            "stop-node-c"
+                        ]
+                    },
+                    "max_workers": 3,
+                    "cancel_on_failure": true
+                }
+            }
+        }
+    ],
+```
+
+The activities of a group must follow each other in the method, in any
+order. At most `max_workers` of them run at the same time, all of them when
+it is not set, one after the other when it is 1. Each activity is recorded
+with its own run in the journal, and its start and completion are sent to
+the experiment's event handlers, as any other activity. The run of the first
+activity of the group also reports the group's timing under the `parallel`
+key.
+
+With `cancel_on_failure`, the first activity of the group that fails cancels
+those not started yet. Whatever this flag, they are also cancelled when the
+first activity of the group fails or the experiment is interrupted, by a
+safeguard for instance. Cancelled activities are recorded as failed runs.
+
+This control must be declared at the experiment level.
+"""
+from datetime import datetime, timezone
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from chaoslib.types import Activity, Configuration, Experiment, Run, Secrets
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
+
+    from chaoslib.run import EventHandlerRegistry
+
+__all__ = [
+    "configure_control",
+    "cleanup_control",
+    "before_method_control",
+    "after_method_control",
+    "before_activity_control",
+    "after_activity_control",
+]
+logger = logging.getLogger("chaostoolkit")
+
+
+class Group:
+    def __init__(
+        self,
+        name: str,
+        position: int,
+        leader: Activity,
+        followers: List[Activity],
+        max_workers: Optional[int],
+        cancel_on_failure: bool,
+    ) -> None:
+        self.name = name
+        self.position = position
+        self.leader = leader
+        self.followers = followers
+        self.max_workers = max_workers
+        self.cancel_on_failure = cancel_on_failure
+        self.leader_run: Optional[Run] = None
+        self.runs: List[Run] = []
+        self.cancelled: List[str] = []
+        self.started = None
+        self._cancelled = False
+        self._lock = threading.Lock()
+        self._futures: List["Future"] = []
+        self._pool: Optional["ThreadPoolExecutor"] = None
+
+    def start(
+        self,
+        experiment: Experiment,
+        configuration: Configuration,
+        secrets: Secrets,
+        event_registry: "EventHandlerRegistry" = None,
+    ) -> None:
+        """
+        Submit the followers while the leader is run by chaostoolkit itself
+        """
+        from concurrent.futures import Future, ThreadPoolExecutor
+
+        from chaoslib.activity import execute_activity
+
+        self.started = time.perf_counter()
+        # the leader takes one of the slots
+        workers = len(self.followers)
+        if self.max_workers:
+            workers = min(workers, self.max_workers - 1)
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="chaosaddons-parallel"
+        )
+        for activity in self.followers:
+            with self._lock:
+                # a follower may already have failed while we submit others
+                if self._cancelled:
+                    f = Future()
+                    f.cancel()
+                    self._futures.append(f)
+                    continue
+
+                f = self._pool.submit(
+                    execute_activity,
+                    experiment=experiment,
+                    activity=activity,
+                    configuration=configuration,
+                    secrets=secrets,
+                    dry=experiment.get("dry"),
+                    event_registry=event_registry,
+                )
+                self._futures.append(f)
+            f.add_done_callback(self._on_done)
+
+    def join(self, leader_run: Run) -> None:
+        """
+        Wait for all the followers and collect their runs. The leader has no
+        run when the experiment was interrupted while it was running.
+        """
+        self.leader_run = leader_run
+        if leader_run is None or leader_run.get("status") != "succeeded":
+            self.cancel()
+
+        for activity, f in zip(self.followers, self._futures):
+            if f.cancelled():
+                self.cancelled.append(activity.get("name"))
+                self.runs.append(cancelled_run(activity))
+                continue
+
+            try:
+                self.runs.append(f.result())
+            except Exception as x:
+                logger.debug(
+                    "Activity '{}' failed".format(activity.get("name")),
+                    exc_info=True,
+                )
+                self.runs.append(cancelled_run(activity, str(x)))
+
+        self._pool.shutdown(wait=True)
+        duration = time.perf_counter() - self.started
+        logger.debug(
+            "Parallel group '{}' took {:.3f}s".format(self.name, duration)
+        )
+
+        if leader_run is not None:
+            leader_run["parallel"] = {
+                "group": self.name,
+                "duration": duration,
+                "activities": [self.leader.get("name")]
+                + [a.get("name") for a in self.followers],
+                "cancelled": self.cancelled,
+            }
+
+    def cancel(self) -> None:
+        """
+        Cancel the followers not started yet
+        """
+        with self._lock:
+            self._cancelled = True
+            for f in self._futures:
+                f.cancel()
+
+    def _on_done(self, f: "Future") -> None:
+        if f.cancelled() or not self.cancel_on_failure:
+            return None
+        if f.exception() is not None or f.result().get("status") != (
+            "succeeded"
+        ):
+            self.cancel()
+
+
+_groups: Dict[int, Group] = {}
+_event_registry: Optional["EventHandlerRegistry"] = None
+
+
+def configure_control(
+    event_registry: "EventHandlerRegistry" = None, **kwargs
+) -> None:
+    """
+    Keep the experiment's event registry so the followers of a group notify
+    the event handlers as the activities chaostoolkit runs itself
+    """
+    global _event_registry
+    _event_registry = event_registry
+
+
+def cleanup_control() -> None:
+    """
+    Forget the event registry of the experiment
+    """
+    global _event_registry
+    _event_registry = None
+
+
+def before_method_control(
+    context: Experiment,
+    groups: Dict[str, List[str]] = None,
+    max_workers: int = None,
+    cancel_on_failure: bool = True,
+) -> None:
+    """
+    Take the followers of each group out of the method so chaostoolkit only
+    runs the first activity of the group itself.
+    """
+    _groups.clear()
+    if max_workers is not None and max_workers <= 1:
+        logger.debug("Parallel groups run sequentially with max_workers=1")
+        return None
+
+    method = context.get("method", [])
+    for name, activity_names in (groups or {}).items():
+        positions = [
+            pos
+            for pos, a in enumerate(method)
+            if activity_name(a) in activity_names
+        ]
+        if len(positions) < 2:
+            logger.debug(
+                "Parallel group '{}' has fewer than 2 members".format(name)
+            )
+            continue
+
+        first, last = positions[0], positions[-1]
+        if last - first + 1 != len(positions):
+            logger.warning(
+                "Activities of parallel group '{}' do not follow each other "
+                "in the method, they will run sequentially".format(name)
+            )
+            continue
+
+        leader = method[first]
+        followers = method[first + 1 : last + 1]
+        del method[first + 1 : last + 1]
+        _groups[id(leader)] = Group(
+            name, first, leader, followers, max_workers, cancel_on_failure
+        )
+
+
+def before_activity_control(
+    context: Activity,
+    experiment: Experiment,
+    configuration: Configuration = None,
+    secrets: Secrets = None,
+    **kwargs,
+) -> None:
+    group = _groups.get(id(context))
+    if group is not None and group.started is None:
+        logger.debug(
+            "Running parallel group '{}' with {} activities".format(
+                group.name, len(group.followers) + 1
+            )
+        )
+        group.start(experiment, configuration, secrets, _event_registry)
+
+
+def after_activity_control(context: Activity, state: Run, **kwargs) -> None:
+    group = _groups.get(id(context))
+    if group is not None and group.started is not None:
+        group.join(state)
+
+
+def after_method_control(context: Experiment, state: List[Run], **kwargs):
+    """
+    Record the runs of the followers right after their leader's and put the
+    followers back in the method. When the experiment was interrupted during
+    the group, they are recorded where the leader's run would have been.
+    """
+    method = context.get("method", [])
+    for group in _groups.values():
+        if group.runs and state is not None:
+            pos = after_leader_run(group, state)
+            state[pos:pos] = group.runs
+
+        for pos, activity in enumerate(method):
+            if activity is group.leader:
+                method[pos + 1 : pos + 1] = group.followers
+                break
+    _groups.clear()
+
+
+###############################################################################
+# Internals
+###############################################################################
+def activity_name(activity: Activity) -> Optional[str]:
+    return activity.get("name") or activity.get("ref")
+
+
+def after_leader_run(group: Group, runs: List[Run]) -> int:
+    """
+    Position right after the leader's run. When the experiment was
+    interrupted, chaostoolkit did not hand the leader's run over so it is
+    found from the leader's position in the method.
+    """
+    for pos, run in enumerate(runs):
+        if run is group.leader_run:
+            return pos + 1
+
+    pos = min(group.position, len(runs))
+    if pos < len(runs) and runs[pos].get("activity") == group.leader:
+        pos += 1
+    return pos
+
+
+def cancelled_run(activity: Activity, reason: str = "cancelled") -> Run:
+    now = datetime.now(timezone.utc).isoformat()
+    return {
+        "activity": activity.copy(),
+        "output": None,
+        "status": "failed",
+        "start": now,
+        "end": now,
+        "duration": 0,
+        "exception": [reason],
+    }
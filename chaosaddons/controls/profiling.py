@@ -0,0 +1,314 @@
+__doc__ = """
+Profiles the activities of the experiment.
+
+For each activity, the control records its wall time, the CPU time consumed
+by the process, the change in resident memory and the time spent in garbage
+collection pauses. These measures are added to the activity's run in the
+journal, under the `profile` key.
+
+```json
+"controls": [
+        {
+            "name": "profiling",
+            "provider": {
+                "type": "python",
+                "module": "chaosaddons.controls.profiling",
+                "arguments": {
+                    "include_safeguards": true,
+                    "profiler": "sampling",
+                    "profile_threshold": 2,
+                    "profile_dir": "./profiles"
+                }
+            }
+        }
+    ],
+```
+
+Safeguard probes are only profiled when `include_safeguards` is set.
+
+When `profiler` is set, the activities are also profiled and, for those that
+lasted at least `profile_threshold` seconds, the profile is written to
+`profile_dir`:
+
+* `"sampling"` samples the stack of the thread running the activity every
+  `sampling_interval` seconds and writes it in the collapsed stacks format
+  (`.collapsed` files) that flamegraph tools read directly
+* `"cprofile"` uses the deterministic `cProfile` profiler and writes its
+  statistics (`.pstats` files)
+
+Memory is read from `/proc/self/statm` and is therefore only reported on
+Linux. CPU time and memory are measured for the whole process, so they
+include the work of activities or safeguards running at the same time.
+
+The time the control spends in its own hooks is reported in the journal
+under the `profiling` key.
+"""
+import gc
+import logging
+import os
+import os.path
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+from chaoslib.types import Activity, Experiment, Journal, Run
+
+from .synchronization import in_safeguard
+
+__all__ = [
+    "before_experiment_control",
+    "before_activity_control",
+    "after_activity_control",
+    "after_experiment_control",
+]
+logger = logging.getLogger("chaostoolkit")
+
+try:
+    PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):  # pragma: no cover
+    PAGE_SIZE = 4096
+
+
+class GCTracker:
+    """
+    Accumulates the time spent in garbage collections while installed.
+    """
+
+    def __init__(self) -> None:
+        self.total = 0.0
+        self._started: Dict[int, float] = {}
+        self.installed = False
+
+    def install(self) -> None:
+        if not self.installed:
+            gc.callbacks.append(self._on_gc)
+            self.installed = True
+
+    def uninstall(self) -> None:
+        if self.installed:
+            gc.callbacks.remove(self._on_gc)
+            self.installed = False
+
+    def _on_gc(self, phase: str, info: Dict[str, Any]) -> None:
+        if phase == "start":
+            self._started[threading.get_ident()] = time.perf_counter()
+        else:
+            started = self._started.pop(threading.get_ident(), None)
+            if started is not None:
+                self.total += time.perf_counter() - started
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples the stack of a thread at a regular interval and aggregates the
+    samples as collapsed stacks.
+    """
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        super().__init__(name="chaosaddons-profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_sampling = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_sampling.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    "{} ({}:{})".format(
+                        code.co_name,
+                        os.path.basename(code.co_filename),
+                        code.co_firstlineno,
+                    )
+                )
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._stop_sampling.set()
+        self.join()
+
+    def dump(self, path: str) -> None:
+        with open(path, "w") as f:
+            for stack, count in self.stacks.items():
+                f.write("{} {}\n".format(stack, count))
+
+
+class Measure:
+    def __init__(self, profiler: Any = None) -> None:
+        self.profiler = profiler
+        self.gc = gc_tracker.total
+        self.rss = read_rss()
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+
+
+gc_tracker = GCTracker()
+_measures: Dict[Tuple[int, int], Measure] = {}
+_lock = threading.Lock()
+_overhead = {"hooks": 0, "duration": 0.0}
+_profile_count = Counter()
+
+
+def before_experiment_control(context: Experiment, **kwargs):
+    """
+    Start counting the overhead and numbering the profiles from scratch
+    """
+    with _lock:
+        _overhead["hooks"] = 0
+        _overhead["duration"] = 0.0
+        _profile_count.clear()
+
+
+def before_activity_control(
+    context: Activity,
+    include_safeguards: bool = False,
+    profiler: str = None,
+    profile_threshold: float = 1.0,
+    profile_dir: str = ".",
+    sampling_interval: float = 0.005,
+) -> None:
+    """
+    Start measuring the activity
+    """
+    start = time.perf_counter()
+    if not include_safeguards and in_safeguard():
+        return None
+
+    gc_tracker.install()
+
+    p = None
+    if profiler == "sampling":
+        p = StackSampler(threading.get_ident(), sampling_interval)
+        p.start()
+    elif profiler == "cprofile":
+        import cProfile
+
+        p = cProfile.Profile()
+        try:
+            p.enable()
+        except ValueError:
+            # another profiler is already active in this process
+            logger.debug("Cannot profile activity", exc_info=True)
+            p = None
+
+    _measures[(threading.get_ident(), id(context))] = Measure(p)
+    add_overhead(time.perf_counter() - start)
+
+
+def after_activity_control(
+    context: Activity,
+    state: Run,
+    include_safeguards: bool = False,
+    profiler: str = None,
+    profile_threshold: float = 1.0,
+    profile_dir: str = ".",
+    sampling_interval: float = 0.005,
+) -> None:
+    """
+    Stop measuring the activity and attach the measures to its run
+    """
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    rss = read_rss()
+    gc_total = gc_tracker.total
+
+    measure = _measures.pop((threading.get_ident(), id(context)), None)
+    if measure is None:
+        return None
+
+    p = measure.profiler
+    if p is not None:
+        if profiler == "sampling":
+            p.stop()
+        else:
+            p.disable()
+
+    duration = wall - measure.wall
+    profile = {
+        "wall": duration,
+        "cpu": cpu - measure.cpu,
+        "gc_pauses": gc_total - measure.gc,
+        "rss_delta": None,
+    }
+    if rss is not None and measure.rss is not None:
+        profile["rss_delta"] = rss - measure.rss
+
+    if p is not None and duration >= profile_threshold:
+        profile["profile_file"] = write_profile(
+            p, context.get("name", "activity"), profiler, profile_dir
+        )
+
+    if state is not None:
+        state["profile"] = profile
+
+    add_overhead(time.perf_counter() - wall)
+
+
+def after_experiment_control(context: Experiment, state: Journal, **kwargs):
+    """
+    Report the overhead of the control itself in the journal
+    """
+    gc_tracker.uninstall()
+    if state is not None:
+        with _lock:
+            state["profiling"] = {
+                "hooks": _overhead["hooks"],
+                "overhead": _overhead["duration"],
+            }
+
+
+###############################################################################
+# Internals
+###############################################################################
+def read_rss() -> Optional[int]:
+    """
+    Current resident memory of the process, in bytes, when available
+    """
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def add_overhead(duration: float) -> None:
+    with _lock:
+        _overhead["hooks"] += 1
+        _overhead["duration"] += duration
+
+
+def write_profile(
+    p: Any, name: str, profiler: str, profile_dir: str
+) -> Optional[str]:
+    """
+    Write the profile to a file named after the activity
+    """
+    safe_name = re.sub(r"[^\w.-]+", "_", name)
+    with _lock:
+        _profile_count[safe_name] += 1
+        index = _profile_count[safe_name]
+
+    ext = "collapsed" if profiler == "sampling" else "pstats"
+    path = os.path.join(profile_dir, "{}-{}.{}".format(safe_name, index, ext))
+    try:
+        os.makedirs(profile_dir, exist_ok=True)
+        if profiler == "sampling":
+            p.dump(path)
+        else:
+            p.dump_stats(path)
+    except OSError:
+        logger.warning(
+            "Failed to write the profile of activity '{}'".format(name),
+            exc_info=True,
+        )
+        return None
+    return path
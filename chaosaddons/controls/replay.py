@@ -0,0 +1,250 @@
+__doc__ = """
+Records the output of activities during a real run and serves them back,
+without executing the activities, in later runs.
+
+This is useful to iterate quickly on the logic of an experiment, such as its
+tolerances, with realistic data but without paying the cost of calling the
+real system.
+
+First, record a run:
+
+```json
+"controls": [
+        {
+            "name": "replay",
+            "provider": {
+                "type": "python",
+                "module": "chaosaddons.controls.replay",
+                "arguments": {
+                    "mode": "record",
+                    "store_path": ".chaos-replay"
+                }
+            }
+        }
+    ],
+```
+
+Then switch the `mode` to `"replay"`. Any activity whose provider was
+recorded is not executed, its recorded output is returned instead. Activities
+that were never recorded are executed normally.
+
+You may restrict the control to a few activities with `target_names`.
+
+Safeguard probes are left alone, they watch the real system and must never
+be served a recorded output. Set `include_safeguards` to `true` to record and
+replay them as well.
+
+Outputs are kept in a local content-addressed store: each output is saved
+once under the digest of its content and indexed by the digest of the
+activity's provider, once configuration and secrets were substituted. An
+activity whose provider changes is therefore never served a stale output.
+
+Only successful runs are recorded. Outputs must be serializable to JSON.
+
+Do not combine this control with the `bypass` control on the same
+activities, a bypassed activity is not executed and its replayed output
+would never be served.
+"""
+import hashlib
+import json
+import logging
+import os
+import os.path
+import tempfile
+from typing import Any, Dict, List, Optional
+
+from chaoslib import substitute
+from chaoslib.types import Activity, Configuration, Run, Secrets
+
+from .synchronization import in_safeguard, restore_provider, swap_provider
+
+__all__ = ["before_activity_control", "after_activity_control"]
+logger = logging.getLogger("chaostoolkit")
+
+# providers swapped in for the activities currently being replayed
+_swapped: Dict[int, Dict[str, Any]] = {}
+
+
+class ReplayStore:
+    """
+    Local content-addressed store of activity outputs.
+
+    Outputs live under `objects/` named by the digest of their content, so
+    identical outputs are stored once. Each recorded provider points to its
+    output through a small file under `refs/`.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Return the digest of the output recorded for the provider key, if any
+        """
+        try:
+            with open(self._ref_path(key)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def load(self, digest: str) -> Any:
+        with open(self._object_path(digest)) as f:
+            return json.load(f)
+
+    def put(self, key: str, output: Any) -> str:
+        """
+        Save the output and index it by the provider key. Returns the digest
+        of the output.
+        """
+        data = json.dumps(output, sort_keys=True).encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            self._write(object_path, data)
+        self._write(self._ref_path(key), digest.encode("utf-8"))
+        return digest
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.path, "objects", digest[:2], digest)
+
+    def _ref_path(self, key: str) -> str:
+        return os.path.join(self.path, "refs", key[:2], key)
+
+    def _write(self, path: str, data: bytes) -> None:
+        """
+        Write the file atomically so a concurrent or interrupted run never
+        reads it half-written.
+        """
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+
+def before_activity_control(
+    context: Activity,
+    configuration: Configuration = None,
+    secrets: Secrets = None,
+    mode: str = "record",
+    store_path: str = ".chaos-replay",
+    target_names: List[str] = None,
+    include_safeguards: bool = False,
+) -> None:
+    """
+    In replay mode, swap the activity's provider for one that returns the
+    recorded output.
+    """
+    if mode != "replay" or not is_targeted(context, target_names):
+        return None
+    if in_safeguard() and not include_safeguards:
+        return None
+
+    store = ReplayStore(store_path)
+    key = provider_hash(context["provider"], configuration, secrets)
+    digest = store.get(key)
+    if not digest:
+        logger.debug(
+            "No output recorded for activity '{}', running it".format(
+                context.get("name")
+            )
+        )
+        return None
+
+    logger.debug(
+        "Replaying recorded output for activity '{}'".format(
+            context.get("name")
+        )
+    )
+    stub = {
+        "type": "python",
+        "module": "chaosaddons.controls.replay",
+        "func": "replay_output",
+        "arguments": {"store_path": store_path, "digest": digest},
+    }
+    _swapped[id(context)] = stub
+    swap_provider(context, stub)
+
+
+def after_activity_control(
+    context: Activity,
+    state: Run,
+    configuration: Configuration = None,
+    secrets: Secrets = None,
+    mode: str = "record",
+    store_path: str = ".chaos-replay",
+    target_names: List[str] = None,
+    include_safeguards: bool = False,
+) -> None:
+    """
+    In record mode, save the activity's output. In replay mode, put back
+    the activity's original provider.
+    """
+    if mode == "replay":
+        stub = _swapped.pop(id(context), None)
+        if stub is not None:
+            restore_provider(context, stub, state)
+            if state is not None:
+                state["replayed"] = True
+        return None
+
+    if mode != "record" or not is_targeted(context, target_names):
+        return None
+    if in_safeguard() and not include_safeguards:
+        return None
+
+    if not state or state.get("status") != "succeeded" or context.get("dry"):
+        return None
+
+    key = provider_hash(context["provider"], configuration, secrets)
+    try:
+        ReplayStore(store_path).put(key, state.get("output"))
+    except (TypeError, ValueError):
+        logger.warning(
+            "Cannot record the output of activity '{}' as it cannot be "
+            "serialized to JSON".format(context.get("name"))
+        )
+    except OSError as x:
+        logger.warning(
+            "Failed to record the output of activity '{}': {}".format(
+                context.get("name"), str(x)
+            )
+        )
+
+
+def replay_output(store_path: str, digest: str) -> Any:
+    """
+    Provider function returning the recorded output
+    """
+    return ReplayStore(store_path).load(digest)
+
+
+###############################################################################
+# Internals
+###############################################################################
+def is_targeted(activity: Activity, target_names: List[str] = None) -> bool:
+    if not target_names:
+        return True
+    return activity.get("name") in target_names
+
+
+def provider_hash(
+    provider: Dict[str, Any],
+    configuration: Configuration = None,
+    secrets: Secrets = None,
+) -> str:
+    """
+    Canonical digest of the provider once its values have been substituted
+    """
+    if configuration or secrets:
+        provider = substitute(provider, configuration, secrets)
+    data = json.dumps(
+        provider, sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
@@ -65,7 +65,9 @@ seconds.
 
 If either of them doesn't meet its tolerance, the entire execution will
 terminate as soon as possible and leave the status of the experiment to
-`interrupted`.
+`interrupted`. Pending `chaosaddons.utils.idle` pauses of the method end
+immediately, those of the rollbacks, which are meant to let the system
+recover, always last their full duration.
 
 Probes that do not declare the `background` or `frequency` properties are meant
 to run before the experiment really starts and will block until they are all
@@ -78,27 +80,76 @@ Bear in mind that your probes can also block the process from exiting. This
 means that while the experiment has ended, your probe could be not returning
 and therefore blocking the process. Make sure your probe do not make blocking
 calls for too long.
+
+Validating the probes, which imports their modules, can be slow for large
+safeguard sets. Probes that were successfully validated are therefore
+remembered in a local cache, `~/.chaostoolkit/safeguards-validation.json` by
+default, and are not validated again until either their definition or the
+Python module providing them changes. Set the
+`validation_cache_path` argument to store that cache elsewhere, or set the
+`validation_cache` argument to `false` to always validate all probes.
+
+Activities still running when a safeguard interrupts the experiment, such as
+a process generating load, keep running until they return on their own,
+unless the `chaosaddons.controls.cancellation` control is declared as well,
+in which case they are cancelled as soon as the safeguard triggers.
+
+To stop the experiment when the host running it is overloaded, use the
+`chaosaddons.probes.host` probe. The safeguard control calls it directly, so
+it can run every 100ms at a negligible cost.
+
+Probes returning large outputs can bound what their runs keep in memory with
+an `output_policy`. The tolerance is always checked against the complete
+output first, then the output is reduced before the run is kept:
+
+```json
+{
+    "name": "safeguard_4",
+    "type": "probe",
+    "provider": {
+        "type": "http",
+        "url": "http://prometheus:9090/api/v1/query?query=up"
+    },
+    "frequency": 5,
+    "tolerance": {
+        "type": "jsonpath",
+        "path": "$.body.data.result[*].value[1]",
+        "expect": "1"
+    },
+    "output_policy": {
+        "type": "jsonpath"
+    }
+}
+```
+
+The `"jsonpath"` policy only keeps the values matched by its `path`, the
+tolerance's path by default. The `"truncate"` policy keeps the first
+`max_bytes` bytes, 4096 by default, of the JSON encoded output. The
+`"digest"` policy keeps the SHA-256 digest and size of the JSON encoded
+output along with an excerpt of `excerpt_bytes` bytes, 256 by default,
+sampled from its start and end. The run then tells which policy applied
+under the `output_bounded` key.
 """
+import hashlib
+import importlib.machinery
+import importlib.util
+import json
 import logging
-from concurrent.futures import Future, ThreadPoolExecutor
+import os
+import os.path
+import shutil
+import tempfile
 from copy import deepcopy
 from datetime import datetime
 from functools import partial
 import sys
 import threading
 import time
-import traceback
-from typing import List
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-from chaoslib.activity import ensure_activity_is_valid, run_activity
-from chaoslib.caching import lookup_activity
-from chaoslib.control import controls
+from chaoslib import __version__ as chaoslib_version
+from chaoslib import substitute
 from chaoslib.exceptions import ActivityFailed, InvalidActivity
-from chaoslib.exit import exit_gracefully
-from chaoslib.hypothesis import (
-    ensure_hypothesis_tolerance_is_valid,
-    within_tolerance,
-)
 from chaoslib.types import (
     Configuration,
     Control,
@@ -109,17 +160,69 @@ from chaoslib.types import (
     Settings,
 )
 
-from .synchronization import experiment_finished
+from ..probes.host import close_samplers, host_is_healthy
+from .limits import limiters
+from .metrics import registry
+from .synchronization import (
+    experiment_finished,
+    idle_interrupted,
+    mark_safeguard_thread,
+)
+
+# the modules running the probes, and the executors running them, are only
+# imported when the hooks need them so that loading this control is cheap
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
 
 
 __all__ = [
     "configure_control",
     "before_experiment_control",
+    "before_rollback_control",
     "after_experiment_control",
     "validate_control",
 ]
 logger = logging.getLogger("chaostoolkit")
 
+VALIDATION_CACHE_PATH = os.path.join(
+    "~", ".chaostoolkit", "safeguards-validation.json"
+)
+VALIDATION_CACHE_MAX_ENTRIES = 10000
+OUTPUT_POLICIES = ("jsonpath", "truncate", "digest")
+DEFAULT_TRUNCATE_BYTES = 4096
+DEFAULT_EXCERPT_BYTES = 256
+HOST_PROBE = ("chaosaddons.probes.host", "host_is_healthy")
+
+probe_executions = registry.counter(
+    "chaosaddons_safeguard_probe_executions",
+    "Safeguard probes executed, by probe and status",
+    ("probe", "status"),
+)
+probe_duration = registry.histogram(
+    "chaosaddons_safeguard_probe_duration_seconds",
+    "Duration of the safeguard probes executions",
+    ("probe",),
+)
+tolerance_failures = registry.counter(
+    "chaosaddons_safeguard_tolerance_failures",
+    "Safeguard probes executions that did not meet their tolerance",
+    ("probe",),
+)
+scheduling_lag = registry.histogram(
+    "chaosaddons_safeguard_scheduling_lag_seconds",
+    "Delay between the time a repeating safeguard was due and its execution",
+    ("probe",),
+)
+running_probes = registry.gauge(
+    "chaosaddons_safeguard_running_probes",
+    "Safeguard probes currently executing",
+)
+trigger_to_exit = registry.histogram(
+    "chaosaddons_safeguard_trigger_to_exit_seconds",
+    "Delay between a safeguard probe run not meeting its tolerance and the "
+    "experiment being told to exit",
+)
+
 
 class Guardian:
     def __init__(self) -> None:
@@ -128,7 +231,9 @@ class Guardian:
         self._setup = False
         self.triggered_by = None
         self.triggered_by_run = None
+        self.triggered_at = None
         self.was_triggered = False
+        self.rolling_back = False
 
     @property
     def interrupted(self) -> bool:
@@ -151,6 +256,17 @@ class Guardian:
         Configure the guardian so that it runs with the right amount of
         resources.
         """
+        # a new experiment, which is not interrupted
+        experiment_finished.clear()
+        idle_interrupted.clear()
+        with self._lock:
+            self._interrupted = False
+        self.triggered_by = None
+        self.triggered_by_run = None
+        self.triggered_at = None
+        self.was_triggered = False
+        self.rolling_back = False
+
         once_count = 0
         repeating_count = 0
         now_count = 0
@@ -165,9 +281,10 @@ class Guardian:
         self.repeating_until = threading.Event()
         self.wait_for_interruption = threading.Event()
         self.now_all_done = threading.Barrier(parties=now_count + 1)
-        self.now = ThreadPoolExecutor(max_workers=now_count or 1)
-        self.once = ThreadPoolExecutor(max_workers=once_count or 1)
-        self.repeating = ThreadPoolExecutor(max_workers=repeating_count or 1)
+        # only the pools that have probes to run are created
+        self.now = make_pool(now_count)
+        self.once = make_pool(once_count)
+        self.repeating = make_pool(repeating_count)
         self.interrupter = threading.Thread(None, self._wait_interruption)
         self._setup = True
 
@@ -227,10 +344,19 @@ class Guardian:
         # this allows the experiment to block until these are passed
         self.now_all_done.wait()
 
-    def interrupt_now(self, triggered_by: str, run: Run) -> None:
+    def interrupt_now(
+        self, triggered_by: str, run: Run, triggered_at: float = None
+    ) -> None:
+        """
+        Interrupt the experiment because of the given run, completed at the
+        `time.perf_counter()` time `triggered_at`, now by default.
+        """
+        if triggered_at is None:
+            triggered_at = time.perf_counter()
         with self._lock:
             self.triggered_by = triggered_by
             self.triggered_by_run = deepcopy(run)
+            self.triggered_at = triggered_at
             self.was_triggered = True
 
         self.wait_for_interruption.set()
@@ -257,12 +383,51 @@ class Guardian:
                 do_exit = True
 
         if do_exit:
-            self._exit()
+            # wake up any pending idle period so the exit is not delayed
+            if not self.rolling_back:
+                idle_interrupted.set()
+            # the running activities are told they are cancelled before the
+            # exit, and are stopped once the exit is signalled, so that those
+            # the exit does not interrupt by itself stop with it
+            from .cancellation import cancel_running
+
+            cancel_running(
+                "safeguard '{}' triggered".format(self.triggered_by),
+                self.triggered_at,
+                before_stopping=self._exit_now,
+            )
+
+    def _exit_now(self) -> None:
+        trigger_to_exit.labels().observe(
+            time.perf_counter() - self.triggered_at
+        )
+        self._exit()
 
     def _exit(self) -> None:
+        from chaoslib.exit import exit_gracefully
+
         exit_gracefully()
 
-    def _log_finished(self, f: Future, probe: Probe) -> None:
+    def pools_usage(self, attribute: str) -> Dict[Tuple[str, ...], float]:
+        """
+        Size of the given attribute of each executor, such as its queue or
+        its threads, when collecting metrics.
+        """
+        if not self._setup:
+            return {}
+
+        usage = {}
+        for name in ("now", "once", "repeating"):
+            pool = getattr(self, name)
+            value = getattr(pool, attribute, None)
+            if value is None:
+                continue
+            usage[(name,)] = (
+                value.qsize() if hasattr(value, "qsize") else len(value)
+            )
+        return usage
+
+    def _log_finished(self, f: "Future", probe: Probe) -> None:
         """
         Logs each safeguard when they terminated.
         """
@@ -285,24 +450,44 @@ class Guardian:
         self.wait_for_interruption.set()
         self.repeating_until.set()
 
-        if sys.version_info >= (3, 9):
-            self.now.shutdown(wait=True, cancel_futures=True)
-            self.repeating.shutdown(wait=True, cancel_futures=True)
-            self.once.shutdown(wait=True, cancel_futures=True)
-        else:
-            self.now.shutdown(wait=True)
-            self.repeating.shutdown(wait=True)
-            self.once.shutdown(wait=True)
+        for pool in (self.now, self.repeating, self.once):
+            if pool is None:
+                continue
+            if sys.version_info >= (3, 9):
+                pool.shutdown(wait=True, cancel_futures=True)
+            else:
+                pool.shutdown(wait=True)
 
+        # the interruption ends with the experiment
+        idle_interrupted.clear()
         logger.debug("Guardian is now terminated")
 
 
 guardian = Guardian()
 
+registry.gauge(
+    "chaosaddons_safeguard_queue_depth",
+    "Safeguard probes waiting for a thread, by pool",
+    ("pool",),
+    callback=partial(guardian.pools_usage, "_work_queue"),
+)
+registry.gauge(
+    "chaosaddons_safeguard_active_threads",
+    "Threads started to run safeguard probes, by pool",
+    ("pool",),
+    callback=partial(guardian.pools_usage, "_threads"),
+)
+
 
 def validate_control(control: Control) -> None:
-    probes = control["provider"].get("arguments", {}).get("probes")
-    validate_probes(probes)
+    arguments = control["provider"].get("arguments", {})
+    probes = arguments.get("probes")
+    cache_path = None
+    if arguments.get("validation_cache", True):
+        cache_path = arguments.get(
+            "validation_cache_path", VALIDATION_CACHE_PATH
+        )
+    validate_probes(probes, cache_path=cache_path)
 
 
 def configure_control(
@@ -311,6 +496,8 @@ def configure_control(
     settings: Settings = None,
     experiment: Experiment = None,
     probes: List[Probe] = None,
+    validation_cache: bool = True,
+    validation_cache_path: str = None,
 ) -> None:
     guardian.prepare(probes)
 
@@ -322,17 +509,38 @@ def before_experiment_control(
     settings: Settings = None,
     experiment: Experiment = None,
     probes: List[Probe] = None,
+    validation_cache: bool = True,
+    validation_cache_path: str = None,
 ) -> None:
     guardian.run(experiment, probes, configuration, secrets, settings)
 
 
+def before_rollback_control(context: Experiment, **kwargs) -> None:
+    # the rollbacks pause for as long as they asked for, even once the
+    # experiment was interrupted
+    guardian.rolling_back = True
+    idle_interrupted.clear()
+
+
 def after_experiment_control(**kwargs):
     guardian.terminate()
+    close_samplers()
 
 
 ###############################################################################
 # Internals
 ###############################################################################
+def make_pool(probes_count: int) -> Optional["ThreadPoolExecutor"]:
+    if not probes_count:
+        return None
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    return ThreadPoolExecutor(
+        max_workers=probes_count, initializer=mark_safeguard_thread
+    )
+
+
 def run_repeatedly(
     guard: Guardian,
     experiment: Experiment,
@@ -342,18 +550,27 @@ def run_repeatedly(
     stop_repeating: threading.Event,
 ) -> None:
     wait_for = probe.get("frequency")
+    lag = scheduling_lag.labels(probe.get("name"))
+    due = None
     while not stop_repeating.is_set():
+        if due is not None:
+            lag.observe(max(0.0, time.perf_counter() - due))
         run = execute_activity(
             experiment=experiment,
             probe=probe,
             configuration=configuration,
             secrets=secrets,
         )
-        stop_repeating.wait(timeout=wait_for)
+        completed_at = time.perf_counter()
+        # check the complete output now so only its bounded version is kept
+        # while waiting for the next tick
+        healthy = probe_is_healthy(probe, run, configuration, secrets)
         if not stop_repeating.is_set():
             interrupt_experiment_on_unhealthy_probe(
-                guard, probe, run, configuration, secrets
+                guard, probe, run, healthy, completed_at
             )
+        due = time.perf_counter() + wait_for
+        stop_repeating.wait(timeout=wait_for)
 
 
 def run_soon(
@@ -369,8 +586,10 @@ def run_soon(
         configuration=configuration,
         secrets=secrets,
     )
+    completed_at = time.perf_counter()
+    healthy = probe_is_healthy(probe, run, configuration, secrets)
     interrupt_experiment_on_unhealthy_probe(
-        guard, probe, run, configuration, secrets
+        guard, probe, run, healthy, completed_at
     )
 
 
@@ -389,30 +608,113 @@ def run_now(
             configuration=configuration,
             secrets=secrets,
         )
+        completed_at = time.perf_counter()
     finally:
         done.wait()
 
+    healthy = probe_is_healthy(probe, run, configuration, secrets)
     interrupt_experiment_on_unhealthy_probe(
-        guard, probe, run, configuration, secrets
+        guard, probe, run, healthy, completed_at
     )
 
 
+def probe_is_healthy(
+    probe: Probe,
+    run: Run,
+    configuration: Configuration,
+    secrets: Secrets,
+) -> bool:
+    """
+    Check the run's output against the probe's tolerance, then apply the
+    probe's output policy to the run.
+    """
+    try:
+        if experiment_finished.is_set():
+            return True
+
+        # we should not stop the experiment because we throttled ourselves
+        if run.get("limits", {}).get("rejected"):
+            return True
+
+        from chaoslib.hypothesis import within_tolerance
+
+        tolerance = probe.get("tolerance")
+        return within_tolerance(
+            tolerance,
+            run["output"],
+            configuration=configuration,
+            secrets=secrets,
+        )
+    finally:
+        bound_output(probe, run, configuration, secrets)
+
+
 def interrupt_experiment_on_unhealthy_probe(
     guard: Guardian,
     probe: Probe,
     run: Run,
-    configuration: Configuration,
-    secrets=Secrets,
+    healthy: bool,
+    completed_at: float = None,
 ) -> None:
     if experiment_finished.is_set():
         return
 
-    tolerance = probe.get("tolerance")
-    checked = within_tolerance(
-        tolerance, run["output"], configuration=configuration, secrets=secrets
-    )
-    if not checked:
-        guard.interrupt_now(probe["name"], run)
+    if not healthy:
+        tolerance_failures.labels(probe["name"]).inc()
+        guard.interrupt_now(probe["name"], run, completed_at)
+
+
+def bound_output(
+    probe: Probe,
+    run: Run,
+    configuration: Configuration = None,
+    secrets: Secrets = None,
+) -> None:
+    """
+    Reduce, in place, the output of the run according to the probe's
+    `output_policy`, if any.
+    """
+    policy = probe.get("output_policy")
+    if not policy or run.get("output") is None:
+        return None
+
+    policy_type = policy.get("type")
+    output = run["output"]
+    bounded = {"policy": policy_type}
+    try:
+        if policy_type == "jsonpath":
+            path = policy.get("path") or probe["tolerance"]["path"]
+            path = substitute(path, configuration, secrets)
+            run["output"] = project_output(output, path)
+        else:
+            data = encode_output(output)
+            bounded["size"] = len(data)
+            if policy_type == "truncate":
+                max_bytes = policy.get("max_bytes", DEFAULT_TRUNCATE_BYTES)
+                if len(data) > max_bytes:
+                    run["output"] = data[:max_bytes].decode(
+                        "utf-8", errors="ignore"
+                    )
+                    bounded["truncated"] = True
+            elif policy_type == "digest":
+                run["output"] = {
+                    "sha256": hashlib.sha256(data).hexdigest(),
+                    "size": len(data),
+                    "excerpt": sample_excerpt(
+                        data, policy.get("excerpt_bytes", DEFAULT_EXCERPT_BYTES)
+                    ),
+                }
+    except Exception:
+        logger.debug(
+            "Failed to apply the output policy of safeguard '{}'".format(
+                probe.get("name")
+            ),
+            exc_info=True,
+        )
+        run["output"] = None
+        bounded["failed"] = True
+
+    run["output_bounded"] = bounded
 
 
 def execute_activity(
@@ -426,6 +728,11 @@ def execute_activity(
     some meta data (like duration, start/end time, exceptions...) during
     the run.
     """
+    import traceback
+
+    from chaoslib.caching import lookup_activity
+    from chaoslib.control import controls
+
     ref = probe.get("ref")
     if ref:
         probe = lookup_activity(ref)
@@ -451,8 +758,23 @@ def execute_activity(
         run = {"activity": probe.copy(), "output": None}
 
         result = None
+        running_probes.labels().inc()
+        limiter = limiters.resolve(probe)
+        acquired = False
         try:
-            result = run_activity(probe, configuration, secrets)
+            if limiter is not None:
+                waited = limiter.acquire()
+                if waited is None:
+                    run["limits"] = {"key": limiter.key, "rejected": True}
+                    raise ActivityFailed(
+                        "safeguard rejected by the limits of '{}'".format(
+                            limiter.key
+                        )
+                    )
+                acquired = True
+                run["limits"] = {"key": limiter.key, "waited": waited}
+
+            result = call_provider(probe, configuration, secrets)
             run["output"] = result
             run["status"] = "succeeded"
         except ActivityFailed as x:
@@ -461,9 +783,16 @@ def execute_activity(
             run["exception"] = traceback.format_exception(type(x), x, None)
         finally:
             end = datetime.utcnow()
+            if acquired:
+                limiter.release()
             run["start"] = start.isoformat()
             run["end"] = end.isoformat()
             run["duration"] = (end - start).total_seconds()
+            running_probes.labels().dec()
+            probe_executions.labels(
+                probe.get("name"), run.get("status", "failed")
+            ).inc()
+            probe_duration.labels(probe.get("name")).observe(run["duration"])
 
             pause_after = pauses.get("after")
             if pause_after:
@@ -474,15 +803,58 @@ def execute_activity(
     return run
 
 
-def validate_probes(probes: List[Probe]):
+def call_provider(
+    probe: Probe, configuration: Configuration, secrets: Secrets
+) -> Any:
+    """
+    Call the built-in probes directly, rather than having chaostoolkit
+    resolve their provider on every tick, and any other probe as usual.
+    """
+    provider = probe.get("provider") or {}
+    if (
+        provider.get("type") != "python"
+        or (provider.get("module"), provider.get("func")) != HOST_PROBE
+    ):
+        from chaoslib.activity import run_activity
+
+        return run_activity(probe, configuration, secrets)
+
+    arguments = provider.get("arguments") or {}
+    if arguments and (configuration or secrets):
+        arguments = substitute(arguments, configuration, secrets)
+    try:
+        return host_is_healthy(**arguments)
+    except Exception as x:
+        raise ActivityFailed(
+            "failed to sample the host: {}".format(str(x))
+        ) from x
+
+
+def validate_probes(probes: List[Probe], cache_path: str = None):
     """
     Validate all probes part of the safeguard control and ensure they are
     valid Chaos Toolkit probes or fail the experiment's run.
+
+    When `cache_path` is set, probes found in that validation cache are not
+    validated again, and those newly validated are added to it.
     """
     if not probes:
         raise InvalidActivity("safeguard control must have at least one probe")
 
+    from chaoslib.activity import ensure_activity_is_valid
+    from chaoslib.hypothesis import ensure_hypothesis_tolerance_is_valid
+
+    cache = load_validation_cache(cache_path) if cache_path else None
+    validated = []
+
     for probe in probes:
+        key = None
+        if cache is not None:
+            key = probe_validation_key(probe)
+            if key in cache:
+                cache[key] = time.time()
+                continue
+
         ensure_activity_is_valid(probe)
 
         if probe["type"] != "probe":
@@ -498,3 +870,186 @@ def validate_probes(probes: List[Probe]):
             )
 
         ensure_hypothesis_tolerance_is_valid(probe["tolerance"])
+        ensure_output_policy_is_valid(probe)
+
+        if key is not None:
+            validated.append(key)
+
+    if validated:
+        now = time.time()
+        for key in validated:
+            cache[key] = now
+        save_validation_cache(cache_path, cache)
+
+
+def ensure_output_policy_is_valid(probe: Probe) -> None:
+    policy = probe.get("output_policy")
+    if policy is None:
+        return None
+
+    if not isinstance(policy, dict) or policy.get("type") not in (
+        OUTPUT_POLICIES
+    ):
+        raise InvalidActivity(
+            "safeguard probe '{}' output policy must be an object whose type "
+            "is one of: {}".format(probe["name"], ", ".join(OUTPUT_POLICIES))
+        )
+
+    if policy["type"] == "jsonpath" and not policy.get("path"):
+        tolerance = probe.get("tolerance")
+        if not isinstance(tolerance, dict) or not tolerance.get("path"):
+            raise InvalidActivity(
+                "safeguard probe '{}' jsonpath output policy needs a path "
+                "when its tolerance has none".format(probe["name"])
+            )
+
+    for key in ("max_bytes", "excerpt_bytes"):
+        value = policy.get(key)
+        if value is not None and (not isinstance(value, int) or value < 0):
+            raise InvalidActivity(
+                "safeguard probe '{}' output policy {} must be a positive "
+                "integer".format(probe["name"], key)
+            )
+
+
+def encode_output(output: Any) -> bytes:
+    if isinstance(output, bytes):
+        return output
+    if isinstance(output, str):
+        return output.encode("utf-8")
+    return json.dumps(output, separators=(",", ":"), default=str).encode(
+        "utf-8"
+    )
+
+
+def sample_excerpt(data: bytes, size: int) -> str:
+    """
+    The start and the end of the data, `size` bytes in total
+    """
+    if len(data) <= size:
+        return data.decode("utf-8", errors="ignore")
+    head = data[: size - size // 2].decode("utf-8", errors="ignore")
+    tail = data[len(data) - size // 2 :].decode("utf-8", errors="ignore")
+    return "{}...{}".format(head, tail)
+
+
+def project_output(output: Any, path: str) -> List[Any]:
+    """
+    The values of the output matched by the JSON path, decoding the output
+    first when it's a JSON document, as the jsonpath tolerance does.
+    """
+    from jsonpath2.path import Path as JSONPath
+
+    if isinstance(output, bytes):
+        output = output.decode("utf-8")
+    if isinstance(output, str):
+        try:
+            output = json.loads(output)
+        except ValueError:
+            pass
+    return [m.current_value for m in JSONPath.parse_str(path).match(output)]
+
+
+def probe_validation_key(probe: Probe) -> str:
+    """
+    Digest of the probe's definition along with the versions of what
+    validates it: chaostoolkit-lib, this package and the package or
+    executable providing the probe.
+
+    The provider's module is identified by the location and modification
+    time of its file, which both change when it is edited or its package
+    upgraded, without having to import it. The executable of a process
+    provider is identified the same way, once resolved from the `PATH`.
+    """
+    from .. import __version__ as chaosaddons_version
+
+    fingerprint: Dict[str, Any] = {
+        "probe": probe,
+        "chaoslib": chaoslib_version,
+        "chaosaddons": chaosaddons_version,
+    }
+    provider = probe.get("provider") or {}
+    if provider.get("type") == "python" and provider.get("module"):
+        origin = module_origin(provider["module"])
+        if origin and os.path.exists(origin):
+            fingerprint["module"] = [origin, os.stat(origin).st_mtime_ns]
+    elif provider.get("type") == "process" and provider.get("path"):
+        path = shutil.which(provider["path"])
+        fingerprint["path"] = path
+        if path:
+            fingerprint["path"] = [path, os.stat(path).st_mtime_ns]
+
+    data = json.dumps(
+        fingerprint, sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def module_origin(name: str) -> Optional[str]:
+    """
+    File of the module, found without importing it nor its parent packages
+    """
+    spec = None
+    parts = name.split(".")
+    try:
+        for i in range(len(parts)):
+            qualname = ".".join(parts[: i + 1])
+            module = sys.modules.get(qualname)
+            if module is not None:
+                spec = getattr(module, "__spec__", None)
+            elif i == 0:
+                spec = importlib.util.find_spec(qualname)
+            elif spec is not None and spec.submodule_search_locations:
+                spec = importlib.machinery.PathFinder.find_spec(
+                    qualname, spec.submodule_search_locations
+                )
+            else:
+                return None
+            if spec is None:
+                return None
+    except (ImportError, ValueError):
+        return None
+    return spec.origin
+
+
+def load_validation_cache(path: str) -> Dict[str, float]:
+    """
+    Load the cache of validated probes, as a mapping of their key to the
+    last time they were seen. Any issue with the cache means we start over
+    with an empty one.
+    """
+    try:
+        with open(os.path.expanduser(path)) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(cache, dict):
+        return {}
+    return cache
+
+
+def save_validation_cache(path: str, cache: Dict[str, float]) -> None:
+    """
+    Save the cache atomically, only keeping the most recently seen probes.
+    """
+    if len(cache) > VALIDATION_CACHE_MAX_ENTRIES:
+        recent = sorted(cache.items(), key=lambda e: e[1], reverse=True)
+        cache = dict(recent[:VALIDATION_CACHE_MAX_ENTRIES])
+
+    path = os.path.expanduser(path)
+    directory = os.path.dirname(path) or "."
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(cache, f)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        logger.debug(
+            "Failed to save safeguards validation cache", exc_info=True
+        )
@@ -1,10 +1,97 @@
 import threading
+from typing import Any, Dict, List
 
-__all__ = ["experiment_finished", "after_experiment_control"]
+from chaoslib.types import Activity, Run
+
+__all__ = [
+    "experiment_finished",
+    "idle_interrupted",
+    "before_experiment_control",
+    "after_experiment_control",
+    "in_safeguard",
+    "mark_safeguard_thread",
+    "swap_provider",
+    "restore_provider",
+]
 
 
 experiment_finished = threading.Event()
 
+# set whenever pending idle periods should end immediately, for instance
+# because the experiment was interrupted or is finished
+idle_interrupted = threading.Event()
+
+# tells activity controls when the activity is a safeguard probe
+_safeguard = threading.local()
+
+# providers swapped by the controls, by activity, in the order they were
+# swapped along with the provider each one replaced
+_swaps: Dict[int, List[List[Dict[str, Any]]]] = {}
+_swaps_lock = threading.Lock()
+
+
+def before_experiment_control(**kwargs):
+    experiment_finished.clear()
+    idle_interrupted.clear()
+
 
 def after_experiment_control(**kwargs):
     experiment_finished.set()
+    idle_interrupted.set()
+
+
+def in_safeguard() -> bool:
+    """
+    Whether the current thread is executing a safeguard probe
+    """
+    return getattr(_safeguard, "running", False)
+
+
+def mark_safeguard_thread() -> None:
+    """
+    Flag the current thread as one dedicated to running safeguard probes
+    """
+    _safeguard.running = True
+
+
+def swap_provider(activity: Activity, provider: Dict[str, Any]) -> None:
+    """
+    Replace the provider of the activity until `restore_provider` is called
+    with the same provider
+    """
+    with _swaps_lock:
+        swaps = _swaps.setdefault(id(activity), [])
+        swaps.append([provider, activity.get("provider")])
+        activity["provider"] = provider
+
+
+def restore_provider(
+    activity: Activity, provider: Dict[str, Any], run: Run = None
+) -> None:
+    """
+    Undo the swap of the provider of the activity, and of its run if given.
+
+    chaostoolkit calls the after hooks of the controls in the same order as
+    their before hooks, so another control may have swapped the provider
+    again since. The swap is then only taken out of the chain and the last
+    control to restore its provider puts back the original one.
+    """
+    with _swaps_lock:
+        swaps = _swaps.get(id(activity), [])
+        for pos, (swapped, original) in enumerate(swaps):
+            if swapped is provider:
+                break
+        else:
+            return None
+
+        del swaps[pos]
+        if pos < len(swaps):
+            # the following swap now replaces our original provider
+            swaps[pos][1] = original
+        else:
+            if activity.get("provider") is provider:
+                activity["provider"] = original
+            if run and run.get("activity", {}).get("provider") is provider:
+                run["activity"]["provider"] = original
+        if not swaps:
+            _swaps.pop(id(activity), None)
@@ -0,0 +1,394 @@
+__doc__ = """
+Records the timeline of the experiment as nested spans: the experiment, its
+phases (steady-state hypothesis, method, rollbacks), their activities and
+the provider call of each activity. Safeguard probes are recorded on their
+own track so they can be lined up against the activities they overlap with.
+
+Spans are timed with the monotonic clock, in nanoseconds, kept in memory
+while the experiment runs and written once it ends:
+
+```json
+"controls": [
+        {
+            "name": "tracing",
+            "provider": {
+                "type": "python",
+                "module": "chaosaddons.controls.tracing",
+                "arguments": {
+                    "trace_path": "./trace.json",
+                    "trace_format": "chrome"
+                }
+            }
+        }
+    ],
+```
+
+The `"chrome"` format is the Trace Event Format read by Perfetto
+(https://ui.perfetto.dev) or `chrome://tracing`. The `"otlp"` format is the
+OpenTelemetry OTLP/JSON encoding, which most tracing backends can import.
+
+The provider call span is derived from the start and end times of the
+activity's run, so its precision is that of the journal: a microsecond.
+"""
+from datetime import datetime, timezone
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from chaoslib.types import Activity, Experiment, Journal, Run
+
+from .synchronization import in_safeguard
+
+__all__ = [
+    "before_experiment_control",
+    "after_experiment_control",
+    "before_hypothesis_control",
+    "after_hypothesis_control",
+    "before_method_control",
+    "after_method_control",
+    "before_rollback_control",
+    "after_rollback_control",
+    "before_activity_control",
+    "after_activity_control",
+]
+logger = logging.getLogger("chaostoolkit")
+
+SAFEGUARDS_TRACK = "safeguards"
+
+
+class Span:
+    __slots__ = (
+        "name",
+        "category",
+        "span_id",
+        "parent_id",
+        "thread_id",
+        "track",
+        "start",
+        "end",
+        "attributes",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        category: str,
+        span_id: str,
+        parent_id: Optional[str],
+        thread_id: int,
+        track: Optional[str],
+        start: int,
+    ) -> None:
+        self.name = name
+        self.category = category
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.thread_id = thread_id
+        self.track = track
+        self.start = start
+        self.end = None
+        self.attributes: Dict[str, Any] = {}
+
+
+class Tracer:
+    """
+    Buffers spans in memory. Each thread keeps its own stack of open spans
+    so spans started from background activities or safeguards nest
+    correctly.
+    """
+
+    def __init__(self) -> None:
+        self.trace_id = os.urandom(16).hex()
+        # offset to turn monotonic timestamps into epoch ones
+        self.epoch_offset = time.time_ns() - time.monotonic_ns()
+        self.spans: List[Span] = []
+        self.root: Optional[Span] = None
+        self._local = threading.local()
+        self._open: Dict[Tuple[int, str, int], Span] = {}
+
+    def begin(
+        self, name: str, category: str, key: int, track: str = None
+    ) -> Span:
+        stack = self._stack()
+        parent = stack[-1] if stack else self.root
+        span = Span(
+            name,
+            category,
+            os.urandom(8).hex(),
+            parent.span_id if parent else None,
+            threading.get_ident(),
+            track,
+            time.monotonic_ns(),
+        )
+        stack.append(span)
+        self._open[(threading.get_ident(), category, key)] = span
+        if self.root is None:
+            self.root = span
+        return span
+
+    def end(self, category: str, key: int) -> Optional[Span]:
+        span = self._open.pop((threading.get_ident(), category, key), None)
+        if span is None:
+            return None
+
+        span.end = time.monotonic_ns()
+        stack = self._stack()
+        if span in stack:
+            stack.remove(span)
+        self.spans.append(span)
+        return span
+
+    def add(
+        self,
+        name: str,
+        category: str,
+        parent: Span,
+        start: int,
+        end: int,
+        attributes: Dict[str, Any] = None,
+    ) -> Span:
+        """
+        Record a span whose bounds are already known
+        """
+        span = Span(
+            name,
+            category,
+            os.urandom(8).hex(),
+            parent.span_id,
+            parent.thread_id,
+            parent.track,
+            start,
+        )
+        span.end = end
+        span.attributes.update(attributes or {})
+        self.spans.append(span)
+        return span
+
+    def to_monotonic(self, iso: str) -> int:
+        dt = datetime.fromisoformat(iso)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        epoch = int(dt.timestamp()) * 1_000_000_000 + dt.microsecond * 1000
+        return epoch - self.epoch_offset
+
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+
+_tracer: Optional[Tracer] = None
+
+
+def before_experiment_control(context: Experiment, **kwargs) -> None:
+    global _tracer
+    _tracer = Tracer()
+    _tracer.begin(context.get("title", "experiment"), "experiment", 0)
+
+
+def after_experiment_control(
+    context: Experiment,
+    state: Journal = None,
+    trace_path: str = "./chaostoolkit-trace.json",
+    trace_format: str = "chrome",
+    **kwargs,
+) -> None:
+    """
+    Close the experiment's span and write the trace
+    """
+    global _tracer
+    tracer = _tracer
+    if tracer is None:
+        return None
+
+    span = tracer.end("experiment", 0)
+    if span is not None and state is not None:
+        span.attributes["status"] = state.get("status")
+
+    _tracer = None
+    if trace_format == "otlp":
+        trace = to_otlp(tracer)
+    else:
+        trace = to_chrome_trace(tracer)
+
+    try:
+        with open(trace_path, "w") as f:
+            json.dump(trace, f)
+    except OSError:
+        logger.warning("Failed to write the trace", exc_info=True)
+        return None
+    logger.debug(
+        "Trace of {} spans written to '{}'".format(
+            len(tracer.spans), trace_path
+        )
+    )
+
+
+def before_hypothesis_control(context: Experiment, **kwargs) -> None:
+    begin_phase("steady-state-hypothesis")
+
+
+def after_hypothesis_control(context: Experiment, **kwargs) -> None:
+    end_phase("steady-state-hypothesis")
+
+
+def before_method_control(context: Experiment, **kwargs) -> None:
+    begin_phase("method")
+
+
+def after_method_control(context: Experiment, **kwargs) -> None:
+    end_phase("method")
+
+
+def before_rollback_control(context: Experiment, **kwargs) -> None:
+    begin_phase("rollbacks")
+
+
+def after_rollback_control(context: Experiment, **kwargs) -> None:
+    end_phase("rollbacks")
+
+
+def before_activity_control(context: Activity, **kwargs) -> None:
+    tracer = _tracer
+    if tracer is None:
+        return None
+
+    track = SAFEGUARDS_TRACK if in_safeguard() else None
+    span = tracer.begin(
+        context.get("name", "activity"), "activity", id(context), track=track
+    )
+    span.attributes["type"] = context.get("type")
+
+
+def after_activity_control(
+    context: Activity, state: Run = None, **kwargs
+) -> None:
+    tracer = _tracer
+    if tracer is None:
+        return None
+
+    span = tracer.end("activity", id(context))
+    if span is None or not state:
+        return None
+
+    span.attributes["status"] = state.get("status")
+    if state.get("start") and state.get("end"):
+        provider = context.get("provider", {})
+        try:
+            tracer.add(
+                provider.get("func") or provider.get("type", "provider"),
+                "provider",
+                span,
+                tracer.to_monotonic(state["start"]),
+                tracer.to_monotonic(state["end"]),
+                {
+                    k: provider[k]
+                    for k in ("type", "module", "func", "path", "url")
+                    if k in provider
+                },
+            )
+        except (TypeError, ValueError):
+            logger.debug("Cannot trace the provider call", exc_info=True)
+
+
+###############################################################################
+# Internals
+###############################################################################
+def begin_phase(name: str) -> None:
+    if _tracer is not None:
+        _tracer.begin(name, "phase", 0)
+
+
+def end_phase(name: str) -> None:
+    # phases never overlap on a thread so the name is informative only
+    if _tracer is not None:
+        _tracer.end("phase", 0)
+
+
+def to_chrome_trace(tracer: Tracer) -> Dict[str, Any]:
+    """
+    Trace Event Format, with timestamps in microseconds. Each thread gets its
+    own track, safeguards threads are grouped under a dedicated name.
+    """
+    events = []
+    threads = {}
+    origin = tracer.root.start if tracer.root else 0
+    for span in sorted(tracer.spans, key=lambda s: s.start):
+        if span.thread_id not in threads:
+            threads[span.thread_id] = span.track or (
+                "main" if not threads else "thread-{}".format(len(threads))
+            )
+        events.append(
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": (span.start - origin) / 1000,
+                "dur": (span.end - span.start) / 1000,
+                "pid": os.getpid(),
+                "tid": span.thread_id,
+                "args": span.attributes,
+            }
+        )
+
+    for thread_id, name in threads.items():
+        events.append(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "tid": thread_id,
+                "args": {"name": name},
+            }
+        )
+    return {"traceEvents": events, "displayTimeUnit": "ns"}
+
+
+def to_otlp(tracer: Tracer) -> Dict[str, Any]:
+    """
+    OTLP/JSON encoding of the spans, with epoch timestamps in nanoseconds.
+    """
+    spans = []
+    for span in tracer.spans:
+        attributes = dict(span.attributes)
+        attributes["chaostoolkit.category"] = span.category
+        if span.track:
+            attributes["chaostoolkit.track"] = span.track
+        otlp_span = {
+            "traceId": tracer.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start + tracer.epoch_offset),
+            "endTimeUnixNano": str(span.end + tracer.epoch_offset),
+            "attributes": [
+                {"key": k, "value": {"stringValue": str(v)}}
+                for k, v in attributes.items()
+                if v is not None
+            ],
+        }
+        if span.parent_id:
+            otlp_span["parentSpanId"] = span.parent_id
+        spans.append(otlp_span)
+
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {
+                            "key": "service.name",
+                            "value": {"stringValue": "chaostoolkit"},
+                        }
+                    ]
+                },
+                "scopeSpans": [
+                    {"scope": {"name": "chaosaddons"}, "spans": spans}
+                ],
+            }
+        ]
+    }
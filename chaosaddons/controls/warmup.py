@@ -0,0 +1,233 @@
+__doc__ = """
+Warms up the providers of the experiment before it starts.
+
+The first call to a Python provider pays for importing its module and
+resolving its function. With heavyweight client libraries, this can add
+seconds to the first activity or safeguard tick. This control loads all the
+Python modules and functions referenced by the experiment, including the
+safeguard probes, in parallel when the controls are configured, before the
+experiment starts. Executables of process providers are resolved too.
+
+You may also declare warm-up hooks, Python functions called once the
+providers are loaded, to open connections or fill caches for instance. Their
+arguments may refer to the experiment's configuration and secrets:
+
+```json
+"controls": [
+        {
+            "name": "warmup",
+            "provider": {
+                "type": "python",
+                "module": "chaosaddons.controls.warmup",
+                "arguments": {
+                    "hooks": [
+                        {
+                            "module": "mymodule",
+                            "func": "connect",
+                            "arguments": {
+                                "endpoint": "https://example.com",
+                                "token": "${api_token}"
+                            }
+                        }
+                    ],
+                    "max_workers": 4
+                }
+            }
+        }
+    ],
+```
+
+The time spent warming up is reported in the journal under the `warmup` key
+so it can be told apart from the experiment's own duration.
+"""
+import importlib
+import logging
+import shutil
+import time
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+from chaoslib import substitute
+from chaoslib.exceptions import InvalidActivity
+from chaoslib.types import (
+    Activity,
+    Configuration,
+    Control,
+    Experiment,
+    Journal,
+    Secrets,
+    Settings,
+)
+
+__all__ = [
+    "validate_control",
+    "configure_control",
+    "after_experiment_control",
+]
+logger = logging.getLogger("chaostoolkit")
+
+# report of the last warm-up, added to the journal at the end
+_report: Dict[str, Any] = {}
+
+
+def validate_control(control: Control) -> None:
+    hooks = control["provider"].get("arguments", {}).get("hooks") or []
+    for hook in hooks:
+        if not hook.get("module") or not hook.get("func"):
+            raise InvalidActivity(
+                "warm-up hooks must declare both a 'module' and a 'func'"
+            )
+
+
+def configure_control(
+    configuration: Configuration = None,
+    secrets: Secrets = None,
+    settings: Settings = None,
+    experiment: Experiment = None,
+    hooks: List[Dict[str, Any]] = None,
+    max_workers: int = None,
+) -> None:
+    """
+    Load all the providers, then call the warm-up hooks, in parallel.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    _report.clear()
+    start = time.monotonic()
+
+    targets = collect_targets(experiment or {})
+    failures = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        providers = dict(
+            zip(targets, pool.map(partial(warmup_provider, failures), targets))
+        )
+        # hooks are called once all the providers are loaded
+        hook_timings = {}
+        if hooks:
+            hook_timings = dict(
+                zip(
+                    ["{}.{}".format(h["module"], h["func"]) for h in hooks],
+                    pool.map(
+                        partial(run_hook, failures, configuration, secrets),
+                        hooks,
+                    ),
+                )
+            )
+
+    duration = time.monotonic() - start
+    _report.update(
+        {
+            "duration": duration,
+            "providers": {
+                ":".join(t): d for t, d in providers.items() if d is not None
+            },
+            "hooks": {k: d for k, d in hook_timings.items() if d is not None},
+            "failures": failures,
+        }
+    )
+    logger.info(
+        "Warmed up {} providers and {} hooks in {:.3f}s".format(
+            len(targets), len(hooks or []), duration
+        )
+    )
+
+
+def after_experiment_control(context: Experiment, state: Journal, **kwargs):
+    """
+    Report the warm-up in the journal
+    """
+    if _report and state is not None:
+        state["warmup"] = dict(_report)
+
+
+###############################################################################
+# Internals
+###############################################################################
+def collect_targets(experiment: Experiment) -> List[Tuple[str, ...]]:
+    """
+    List, without duplicates, the providers the experiment will call.
+
+    Python providers are identified by `("python", module, func)` and
+    process providers by `("process", path)`.
+    """
+    from chaoslib.control import get_global_controls
+
+    activities = []
+    activities.extend(
+        experiment.get("steady-state-hypothesis", {}).get("probes", [])
+    )
+    activities.extend(experiment.get("method", []))
+    activities.extend(experiment.get("rollbacks", []))
+
+    controls = list(experiment.get("controls", []))
+    controls.extend(get_global_controls())
+    for control in controls:
+        arguments = control.get("provider", {}).get("arguments") or {}
+        if isinstance(arguments, dict):
+            activities.extend(arguments.get("probes") or [])
+
+    targets = []
+    for activity in activities:
+        target = provider_target(activity)
+        if target and target not in targets:
+            targets.append(target)
+    return targets
+
+
+def provider_target(activity: Activity) -> Optional[Tuple[str, ...]]:
+    provider = activity.get("provider") or {}
+    provider_type = provider.get("type")
+    if provider_type == "python" and provider.get("module"):
+        return ("python", provider["module"], provider.get("func", ""))
+    if provider_type == "process" and provider.get("path"):
+        return ("process", provider["path"])
+    return None
+
+
+def warmup_provider(
+    failures: List[str], target: Tuple[str, ...]
+) -> Optional[float]:
+    """
+    Load a single provider and return how long it took or `None` when it
+    could not be loaded.
+    """
+    start = time.monotonic()
+    try:
+        if target[0] == "python":
+            mod = importlib.import_module(target[1])
+            getattr(mod, target[2])
+        elif target[0] == "process":
+            if shutil.which(target[1]) is None:
+                raise FileNotFoundError(target[1])
+    except Exception as x:
+        logger.debug(
+            "Failed to warm up provider {}".format(":".join(target)),
+            exc_info=True,
+        )
+        failures.append("{}: {}".format(":".join(target), str(x)))
+        return None
+    return time.monotonic() - start
+
+
+def run_hook(
+    failures: List[str],
+    configuration: Configuration,
+    secrets: Secrets,
+    hook: Dict[str, Any],
+) -> Optional[float]:
+    name = "{}.{}".format(hook["module"], hook["func"])
+    start = time.monotonic()
+    try:
+        mod = importlib.import_module(hook["module"])
+        func = getattr(mod, hook["func"])
+        arguments = hook.get("arguments") or {}
+        if configuration or secrets:
+            arguments = substitute(arguments, configuration, secrets)
+        func(**arguments)
+    except Exception as x:
+        logger.warning(
+            "Warm-up hook '{}' failed: {}".format(name, str(x)), exc_info=True
+        )
+        failures.append("{}: {}".format(name, str(x)))
+        return None
+    return time.monotonic() - start
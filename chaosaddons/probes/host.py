@@ -0,0 +1,248 @@
+__doc__ = """
+A cheap probe telling if the host running the experiment is overloaded,
+meant to be used as a safeguard probe running at a high frequency:
+
+```json
+{
+    "name": "host-is-not-overloaded",
+    "type": "probe",
+    "provider": {
+        "type": "python",
+        "module": "chaosaddons.probes.host",
+        "func": "host_is_healthy",
+        "arguments": {
+            "max_cpu_percent": 90,
+            "max_memory_percent": 90,
+            "max_load": 2,
+            "max_disk_percent": 95,
+            "disk_path": "/",
+            "max_fd_percent": 80
+        }
+    },
+    "frequency": 0.1,
+    "tolerance": true
+}
+```
+
+The probe returns `false` as soon as one of the readings goes over its
+threshold. Readings without a threshold are not sampled at all:
+
+* `max_cpu_percent`: CPU usage since the previous sample, from `/proc/stat`
+* `max_memory_percent`: memory not available to start new applications,
+  from `/proc/meminfo`
+* `max_load`: one minute load average per CPU, from `/proc/loadavg`
+* `max_disk_percent`: space used on the filesystem of `disk_path`
+* `max_fd_percent`: file handles allocated out of the system's maximum, from
+  `/proc/sys/fs/file-nr`
+
+The `/proc` files are kept open and read into buffers allocated once, and
+the safeguard control calls this probe directly, so each sample only costs a
+few system calls. This probe is only available on Linux.
+"""
+import logging
+import os
+import threading
+from typing import Dict, IO, Optional, Tuple
+
+__all__ = ["host_is_healthy"]
+logger = logging.getLogger("chaostoolkit")
+
+BUFFER_SIZE = 8192
+# /proc/stat counts in ticks of 10ms, CPU usage is only computed over at least
+# that many ticks per CPU so samples taken too close are not all noise
+MIN_CPU_TICKS = 5
+
+
+class ProcFile:
+    """
+    A `/proc` file kept open and read again, from its start, into the same
+    buffer on each sample.
+
+    Hold its `lock` while reading and parsing the buffer, probes sharing
+    their arguments share their sampler and may sample it at the same time.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.buffer = bytearray(BUFFER_SIZE)
+        self._view = memoryview(self.buffer)
+        self._file: IO[bytes] = open(path, "rb", buffering=0)
+
+    def read(self) -> int:
+        """
+        Read the file, returns how many bytes of the buffer were filled
+        """
+        self._file.seek(0)
+        return self._file.readinto(self._view)
+
+    def close(self) -> None:
+        self._view.release()
+        self._file.close()
+
+
+class HostSampler:
+    def __init__(self, disk_path: str = "/") -> None:
+        self.disk_path = disk_path
+        self.cpu_count = os.cpu_count() or 1
+        self._lock = threading.Lock()
+        self._files: Dict[str, ProcFile] = {}
+        self._cpu_times: Optional[Tuple[int, int]] = None
+        self._cpu_percent = 0.0
+
+    def cpu_percent(self) -> float:
+        """
+        CPU usage since the previous sample, since boot on the first one.
+        Samples taken too close to the previous one return its value.
+        """
+        f = self._proc_file("/proc/stat")
+        # the baseline is updated under the same lock, so it never goes back
+        # to an older reading
+        with f.lock:
+            n = f.read()
+            end = f.buffer.find(b"\n", 0, n)
+            # cpu user nice system idle iowait irq softirq steal ...
+            fields = f.buffer[4:end].split()
+            total = sum(int(v) for v in fields[:8])
+            idle = int(fields[3]) + int(fields[4])
+
+            previous = self._cpu_times
+            if previous is not None:
+                elapsed = total - previous[0]
+                if elapsed < MIN_CPU_TICKS * self.cpu_count:
+                    return self._cpu_percent
+                busy = elapsed - (idle - previous[1])
+            else:
+                elapsed, busy = total, total - idle
+
+            self._cpu_times = (total, idle)
+            if elapsed > 0:
+                self._cpu_percent = 100.0 * busy / elapsed
+            return self._cpu_percent
+
+    def memory_percent(self) -> float:
+        f = self._proc_file("/proc/meminfo")
+        with f.lock:
+            n = f.read()
+            total = meminfo_field(f.buffer, n, b"MemTotal:")
+            available = meminfo_field(f.buffer, n, b"MemAvailable:")
+        if not total:
+            return 0.0
+        return 100.0 * (total - available) / total
+
+    def load(self) -> float:
+        f = self._proc_file("/proc/loadavg")
+        with f.lock:
+            n = f.read()
+            load = float(f.buffer[: f.buffer.find(b" ", 0, n)])
+        return load / self.cpu_count
+
+    def disk_percent(self) -> float:
+        st = os.statvfs(self.disk_path)
+        # the space reserved to root counts as used, as `df` does
+        used = st.f_blocks - st.f_bfree
+        usable = used + st.f_bavail
+        if not usable:
+            return 0.0
+        return 100.0 * used / usable
+
+    def fd_percent(self) -> float:
+        f = self._proc_file("/proc/sys/fs/file-nr")
+        with f.lock:
+            n = f.read()
+            allocated, unused, maximum = f.buffer[:n].split()
+        return 100.0 * (int(allocated) - int(unused)) / int(maximum)
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+    def _proc_file(self, path: str) -> ProcFile:
+        f = self._files.get(path)
+        if f is None:
+            with self._lock:
+                f = self._files.get(path)
+                if f is None:
+                    f = self._files[path] = ProcFile(path)
+        return f
+
+
+# one sampler per set of arguments, probes with the same arguments share it
+# along with its CPU baseline
+_samplers: Dict[Tuple, HostSampler] = {}
+_samplers_lock = threading.Lock()
+
+
+def host_is_healthy(
+    max_cpu_percent: float = None,
+    max_memory_percent: float = None,
+    max_load: float = None,
+    max_disk_percent: float = None,
+    disk_path: str = "/",
+    max_fd_percent: float = None,
+) -> bool:
+    """
+    Sample the host's resources and tell if they are all below their
+    threshold.
+    """
+    key = (
+        max_cpu_percent,
+        max_memory_percent,
+        max_load,
+        max_disk_percent,
+        disk_path,
+        max_fd_percent,
+    )
+    sampler = _samplers.get(key)
+    if sampler is None:
+        with _samplers_lock:
+            sampler = _samplers.get(key)
+            if sampler is None:
+                sampler = _samplers[key] = HostSampler(disk_path)
+
+    checks = (
+        ("cpu", max_cpu_percent, sampler.cpu_percent),
+        ("memory", max_memory_percent, sampler.memory_percent),
+        ("load", max_load, sampler.load),
+        ("disk", max_disk_percent, sampler.disk_percent),
+        ("file descriptors", max_fd_percent, sampler.fd_percent),
+    )
+    for name, threshold, sample in checks:
+        if threshold is None:
+            continue
+        value = sample()
+        if value > threshold:
+            logger.warning(
+                "Host {} is at {:.2f}, over its threshold of {}".format(
+                    name, value, threshold
+                )
+            )
+            return False
+    return True
+
+
+def close_samplers() -> None:
+    """
+    Close the `/proc` files kept open by the samplers
+    """
+    with _samplers_lock:
+        for sampler in _samplers.values():
+            sampler.close()
+        _samplers.clear()
+
+
+###############################################################################
+# Internals
+###############################################################################
+def meminfo_field(buffer: bytearray, size: int, name: bytes) -> int:
+    """
+    Value, in kB, of a `/proc/meminfo` field, found without splitting the
+    whole file
+    """
+    start = buffer.find(name, 0, size)
+    if start == -1:
+        return 0
+    start += len(name)
+    end = buffer.find(b"\n", start, size)
+    return int(buffer[start:end].split()[0])
@@ -1,5 +1,6 @@
 import time
 
+from chaosaddons.controls.synchronization import idle_interrupted
 
 __all__ = ["idle_for"]
 
@@ -7,9 +8,15 @@ __all__ = ["idle_for"]
 def idle_for(duration: float) -> None:
     """
     Pauses the experiment without blocking the process completely.
+
+    The pause ends as soon as the duration has elapsed or when a safeguard
+    interrupts the experiment, whichever comes first. Pauses in the rollbacks
+    always last their full duration.
     """
-    start = time.time()
-    end = start + duration
+    end = time.monotonic() + duration
 
-    while time.time() < end:
-        time.sleep(0.1)
+    while not idle_interrupted.is_set():
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            break
+        idle_interrupted.wait(timeout=remaining)
@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_benchmarks(*args):
+    return subprocess.run(
+        [sys.executable, "-m", "benchmarks", "--quick", *args],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+
+def test_benchmarks_write_machine_readable_results(tmp_path):
+    output = tmp_path / "results.json"
+    proc = run_benchmarks("--output", str(output))
+    assert proc.returncode == 0, proc.stderr
+
+    report = json.loads(output.read_text())
+    assert report["format"] == 1
+    names = {r["name"] for r in report["results"]}
+    assert names >= {
+        "import_time",
+        "guardian.startup",
+        "guardian.terminate",
+        "guardian.tick_throughput",
+        "guardian.scheduling_lag",
+        "guardian.trigger_to_exit",
+        "repeat.expansion",
+        "bypass.matching.cold",
+        "bypass.matching.warm",
+    }
+    for result in report["results"]:
+        assert result["samples"] > 0
+        assert result["min"] <= result["median"] <= result["max"]
+
+
+def test_benchmarks_fail_on_regressions(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    proc = run_benchmarks(
+        "--only", "repeat.expansion", "--output", str(baseline)
+    )
+    assert proc.returncode == 0, proc.stderr
+
+    report = json.loads(baseline.read_text())
+    for result in report["results"]:
+        result["median"] /= 100
+    baseline.write_text(json.dumps(report))
+
+    proc = run_benchmarks(
+        "--only",
+        "repeat.expansion",
+        "--output",
+        str(tmp_path / "results.json"),
+        "--baseline",
+        str(baseline),
+    )
+    assert proc.returncode == 1
+    assert "regressions" in proc.stderr
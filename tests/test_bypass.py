@@ -0,0 +1,131 @@
+from chaoslib.exceptions import InvalidActivity
+import pytest
+
+from chaosaddons.controls.bypass import (
+    Selector,
+    after_activity_control,
+    after_experiment_control,
+    before_activity_control,
+    before_experiment_control,
+    validate_control,
+)
+
+
+def make_activity(name, type="action", module="mymod", func="f", tags=None):
+    activity = {
+        "name": name,
+        "type": type,
+        "provider": {"type": "python", "module": module, "func": func},
+    }
+    if tags:
+        activity["tags"] = tags
+    return activity
+
+
+def test_bypass_by_name_sets_and_removes_dry():
+    a = make_activity("say-hello")
+    b = make_activity("say-goodbye")
+
+    before_experiment_control(context={}, target_names=["say-hello"])
+    before_activity_control(context=a, target_names=["say-hello"])
+    before_activity_control(context=b, target_names=["say-hello"])
+    assert a["dry"] is True
+    assert "dry" not in b
+
+    after_activity_control(context=a, target_names=["say-hello"])
+    assert "dry" not in a
+    after_experiment_control()
+
+
+def test_bypass_by_type():
+    selector = Selector(target_type="probe")
+    assert selector.matches(make_activity("a", type="probe"))
+    assert not selector.matches(make_activity("b", type="action"))
+
+
+def test_bypass_by_glob_and_regex():
+    selector = Selector(
+        target_patterns=["restart-*"], target_regexes=[r"drain-node-\d+"]
+    )
+    assert selector.matches(make_activity("restart-db"))
+    assert selector.matches(make_activity("drain-node-12"))
+    assert not selector.matches(make_activity("drain-node-12-later"))
+    assert not selector.matches(make_activity("please-restart-db"))
+
+
+def test_bypass_by_provider():
+    selector = Selector(
+        target_providers=[
+            {"type": "python", "module": "chaosk8s.node.actions"},
+            {"type": "python", "module": "mymod", "func": "g"},
+        ]
+    )
+    assert selector.matches(make_activity("a", module="chaosk8s.node.actions"))
+    assert selector.matches(make_activity("b", func="g"))
+    assert not selector.matches(make_activity("c", func="f"))
+
+
+def test_bypass_by_tags():
+    selector = Selector(target_tags=["unsafe"])
+    assert selector.matches(make_activity("a", tags=["db", "unsafe"]))
+    assert not selector.matches(make_activity("b", tags=["db"]))
+    assert not selector.matches(make_activity("c"))
+
+
+def test_decision_is_computed_once_per_activity():
+    selector = Selector(target_names=["a"])
+    activity = make_activity("a")
+    assert selector.matches(activity)
+
+    # renaming the activity does not change the remembered decision
+    activity["name"] = "b"
+    assert selector.matches(activity)
+    assert not selector.matches(make_activity("b"))
+
+
+def test_each_bypass_control_has_its_own_selectors():
+    by_name = {"target_names": ["a"]}
+    by_type = {"target_type": "action"}
+    a = make_activity("a", type="probe")
+    b = make_activity("b", type="action")
+    c = make_activity("c", type="probe")
+
+    # a global control and an experiment one
+    before_experiment_control(context={}, **by_name)
+    before_experiment_control(context={}, **by_type)
+    for activity in (a, b, c):
+        before_activity_control(context=activity, **by_name)
+        before_activity_control(context=activity, **by_type)
+    assert a.get("dry") is True
+    assert b.get("dry") is True
+    assert "dry" not in c
+
+    # a control declared on the activity only
+    d = make_activity("d", type="probe")
+    before_activity_control(context=d, target_names=["d"])
+    assert d.get("dry") is True
+    after_experiment_control()
+
+
+def test_bypass_by_regex_with_inline_flags():
+    selector = Selector(
+        target_patterns=["restart-*"],
+        target_regexes=["(?i)drain-.*", r"(node)-\1"],
+    )
+    assert selector.matches(make_activity("DRAIN-node"))
+    assert selector.matches(make_activity("restart-db"))
+    assert selector.matches(make_activity("node-node"))
+    assert not selector.matches(make_activity("node-db"))
+
+
+def test_invalid_regex_is_rejected():
+    control = {
+        "name": "bypass",
+        "provider": {
+            "type": "python",
+            "module": "chaosaddons.controls.bypass",
+            "arguments": {"target_regexes": ["drain-(node"]},
+        },
+    }
+    with pytest.raises(InvalidActivity):
+        validate_control(control)
@@ -0,0 +1,259 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from chaoslib.activity import run_activity
+from chaoslib.exceptions import ActivityFailed
+from chaoslib.exit import exit_signals
+from chaoslib.experiment import run_experiment
+
+from chaosaddons.controls.cancellation import (
+    after_activity_control,
+    after_experiment_control,
+    before_activity_control,
+    cancel_running,
+    current_token,
+)
+
+
+def run_in_thread(activity, outcome, **control_args):
+    """
+    Run the activity wrapped by the control hooks, from its own thread as
+    chaostoolkit would for a background activity.
+    """
+
+    def run():
+        before_activity_control(activity, **control_args)
+        state = {"activity": activity.copy()}
+        try:
+            outcome["token"] = current_token()
+            state["output"] = run_activity(activity, {}, {})
+        except ActivityFailed as x:
+            outcome["error"] = str(x)
+        finally:
+            after_activity_control(activity, state=state)
+            outcome["state"] = state
+
+    t = threading.Thread(target=run)
+    t.start()
+    return t
+
+
+def test_process_group_is_terminated(tmp_path):
+    pid_file = tmp_path / "pid"
+    activity = {
+        "name": "load",
+        "type": "action",
+        "provider": {
+            "type": "process",
+            "path": "sh",
+            "arguments": "-c 'sleep 30 & echo $! > {}; wait'".format(pid_file),
+        },
+    }
+    original_provider = activity["provider"]
+    outcome = {}
+    t = run_in_thread(activity, outcome, grace_period=1)
+
+    deadline = time.monotonic() + 5
+    while not pid_file.exists() or not pid_file.read_text().strip():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    child = int(pid_file.read_text())
+
+    start = time.monotonic()
+    assert cancel_running("test") == 1
+    t.join(timeout=5)
+    assert not t.is_alive()
+    assert time.monotonic() - start < 2
+
+    assert "cancelled" in outcome["error"]
+    assert outcome["state"]["cancelled"]["reason"] == "test"
+    assert outcome["state"]["cancelled"]["stopped_after"] < 2
+    assert outcome["state"]["activity"]["provider"] == original_provider
+    assert activity["provider"] == original_provider
+
+    # the grandchild was stopped with its group
+    time.sleep(0.1)
+    try:
+        os.kill(child, 0)
+        with open("/proc/{}/stat".format(child)) as f:
+            assert f.read().split()[2] == "Z"
+    except (ProcessLookupError, FileNotFoundError):
+        pass
+
+
+def test_process_output_when_not_cancelled():
+    activity = {
+        "name": "echo",
+        "type": "action",
+        "provider": {
+            "type": "process",
+            "path": "echo",
+            "arguments": ["hello"],
+        },
+    }
+    outcome = {}
+    run_in_thread(activity, outcome).join(timeout=5)
+
+    assert outcome["state"]["output"] == {
+        "status": 0,
+        "stdout": "hello\n",
+        "stderr": "",
+    }
+    assert "cancelled" not in outcome["state"]
+
+
+def test_http_call_is_abandoned():
+    class SlowHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(2)
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        activity = {
+            "name": "slow-call",
+            "type": "action",
+            "provider": {
+                "type": "http",
+                "url": "http://127.0.0.1:{}/".format(server.server_address[1]),
+            },
+        }
+        outcome = {}
+        t = run_in_thread(activity, outcome)
+        time.sleep(0.2)
+
+        start = time.monotonic()
+        cancel_running("test")
+        t.join(timeout=5)
+        assert time.monotonic() - start < 1
+        assert "cancelled" in outcome["error"]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_python_providers_poll_their_token():
+    activity = {
+        "name": "wait",
+        "type": "action",
+        "provider": {
+            "type": "python",
+            "module": "os.path",
+            "func": "exists",
+            "arguments": {"path": "/tmp"},
+        },
+    }
+    ready = threading.Event()
+    outcome = {}
+
+    def run():
+        before_activity_control(activity)
+        outcome["token"] = current_token()
+        ready.set()
+        outcome["cancelled"] = outcome["token"].wait(5)
+        after_activity_control(activity, state=None)
+
+    t = threading.Thread(target=run)
+    t.start()
+    ready.wait(1)
+    cancel_running("test")
+    t.join(timeout=5)
+
+    assert outcome["cancelled"] is True
+    assert outcome["token"].reason == "test"
+    assert current_token().cancelled is False
+    after_experiment_control()
+
+
+def test_interrupted_method_activity_is_recorded_as_cancelled():
+    process = {"type": "process", "path": "sleep", "arguments": "30"}
+    experiment = {
+        "title": "cancellation",
+        "description": "n/a",
+        "method": [{"name": "load", "type": "action", "provider": process}],
+        "controls": [
+            {
+                "name": "safeguards",
+                "provider": {
+                    "type": "python",
+                    "module": "chaosaddons.controls.safeguards",
+                    "arguments": {
+                        "validation_cache": False,
+                        "probes": [
+                            {
+                                "name": "late",
+                                "type": "probe",
+                                "background": True,
+                                "provider": {
+                                    "type": "python",
+                                    "module": "chaosaddons.utils.idle",
+                                    "func": "idle_for",
+                                    "arguments": {"duration": 0.3},
+                                },
+                                "tolerance": True,
+                            }
+                        ],
+                    },
+                },
+            },
+            {
+                "name": "cancellation",
+                "provider": {
+                    "type": "python",
+                    "module": "chaosaddons.controls.cancellation",
+                    "arguments": {"grace_period": 1},
+                },
+            },
+        ],
+    }
+
+    start = time.monotonic()
+    with exit_signals():
+        journal = run_experiment(experiment)
+    assert time.monotonic() - start < 2
+
+    assert journal["status"] == "interrupted"
+    run = journal["run"][0]
+    assert run["activity"]["provider"] == process
+    assert experiment["method"][0]["provider"] == process
+    assert run["cancelled"]["reason"] == "safeguard 'late' triggered"
+    assert 0 <= run["cancelled"]["stopped_after"] < 1
+
+
+def test_provider_is_restored_alongside_other_controls():
+    from chaosaddons.controls import limits
+
+    limits.configure_control(limits={"busy": {"concurrency": 1, "max_wait": 0}})
+    provider = {"type": "process", "path": "true"}
+    cancellation = (before_activity_control, after_activity_control)
+    limiting = (limits.before_activity_control, limits.after_activity_control)
+    try:
+        limiter = limits.limiters.resolve({"tags": ["busy"]})
+        limiter.acquire()
+        for order in ([cancellation, limiting], [limiting, cancellation]):
+            activity = {
+                "name": "load",
+                "type": "action",
+                "tags": ["busy"],
+                "provider": provider,
+            }
+            for before, _ in order:
+                before(context=activity)
+            run = {"activity": activity.copy(), "status": "failed"}
+            for _, after in order:
+                after(context=activity, state=run)
+
+            assert activity["provider"] is provider
+            assert run["activity"]["provider"] is provider
+            assert run["limits"] == {"key": "busy", "rejected": True}
+    finally:
+        limits.after_experiment_control()
+        after_experiment_control()
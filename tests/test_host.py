@@ -0,0 +1,127 @@
+import sys
+import threading
+
+import pytest
+
+from chaosaddons.controls.safeguards import execute_activity
+from chaosaddons.probes.host import (
+    HostSampler,
+    ProcFile,
+    close_samplers,
+    host_is_healthy,
+    meminfo_field,
+)
+
+pytestmark = pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="reads /proc"
+)
+
+
+def make_probe(**arguments):
+    return {
+        "name": "host",
+        "type": "probe",
+        "provider": {
+            "type": "python",
+            "module": "chaosaddons.probes.host",
+            "func": "host_is_healthy",
+            "arguments": arguments,
+        },
+        "tolerance": True,
+    }
+
+
+def test_readings_are_percentages():
+    sampler = HostSampler()
+    try:
+        for sample in (
+            sampler.cpu_percent,
+            sampler.memory_percent,
+            sampler.disk_percent,
+            sampler.fd_percent,
+        ):
+            assert 0 <= sample() <= 100
+        assert sampler.load() >= 0
+    finally:
+        sampler.close()
+
+
+def test_samples_reuse_their_buffer():
+    sampler = HostSampler()
+    try:
+        sampler.memory_percent()
+        buffer = sampler._files["/proc/meminfo"].buffer
+        sampler.memory_percent()
+        assert sampler._files["/proc/meminfo"].buffer is buffer
+    finally:
+        sampler.close()
+
+
+def test_samples_are_read_and_parsed_under_lock(monkeypatch):
+    read = ProcFile.read
+    reads = []
+
+    def locked_read(self):
+        assert self.lock.locked()
+        n = read(self)
+        reads.append(self.path)
+        return n
+
+    monkeypatch.setattr(ProcFile, "read", locked_read)
+    sampler = HostSampler()
+    try:
+        threads = [
+            threading.Thread(target=sample)
+            for sample in (
+                sampler.cpu_percent,
+                sampler.memory_percent,
+                sampler.load,
+                sampler.fd_percent,
+            )
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(reads) == len(threads)
+    finally:
+        sampler.close()
+
+
+def test_meminfo_field():
+    data = bytearray(b"MemTotal:       16000 kB\nMemAvailable:    4000 kB\n")
+    assert meminfo_field(data, len(data), b"MemTotal:") == 16000
+    assert meminfo_field(data, len(data), b"MemAvailable:") == 4000
+    assert meminfo_field(data, len(data), b"SwapTotal:") == 0
+
+
+def test_thresholds():
+    try:
+        assert host_is_healthy() is True
+        assert host_is_healthy(max_memory_percent=100, max_fd_percent=100)
+        assert host_is_healthy(max_disk_percent=-1) is False
+    finally:
+        close_samplers()
+
+
+def test_safeguard_calls_the_probe_directly(monkeypatch):
+    from chaoslib import activity
+
+    def run_activity(*args, **kwargs):
+        raise AssertionError("should not go through chaostoolkit")
+
+    monkeypatch.setattr(activity, "run_activity", run_activity)
+    try:
+        run = execute_activity(
+            None, make_probe(max_disk_percent=-1), None, None
+        )
+        assert run["status"] == "succeeded"
+        assert run["output"] is False
+
+        run = execute_activity(
+            None, make_probe(max_disk_percent=-1, disk_path="/nope"), None, None
+        )
+        assert run["status"] == "failed"
+    finally:
+        close_samplers()
@@ -0,0 +1,26 @@
+import threading
+import time
+
+from chaosaddons.controls.synchronization import idle_interrupted
+from chaosaddons.utils.idle import idle_for
+
+
+def test_idle_for_waits_for_duration():
+    idle_interrupted.clear()
+    start = time.monotonic()
+    idle_for(0.2)
+    elapsed = time.monotonic() - start
+    assert 0.2 <= elapsed < 0.3
+
+
+def test_idle_for_wakes_up_when_interrupted():
+    idle_interrupted.clear()
+    timer = threading.Timer(0.1, idle_interrupted.set)
+    timer.start()
+    try:
+        start = time.monotonic()
+        idle_for(10)
+        assert time.monotonic() - start < 1
+    finally:
+        timer.cancel()
+        idle_interrupted.clear()
@@ -0,0 +1,60 @@
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = (
+    "concurrent.futures",
+    "http.server",
+    "chaoslib.activity",
+    "chaoslib.caching",
+    "chaoslib.control",
+    "chaoslib.exit",
+    "chaoslib.hypothesis",
+    "requests",
+)
+SCRIPT = """
+import sys
+import chaoslib.types
+before = set(sys.modules)
+import {module}
+print(" ".join(sorted(set(sys.modules) - before)))
+"""
+
+
+def loaded_by(module):
+    proc = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(module=module)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return set(proc.stdout.split())
+
+
+def test_package_does_not_resolve_its_version_on_import():
+    assert "importlib.metadata" not in loaded_by("chaosaddons")
+
+    import chaosaddons
+
+    assert chaosaddons.__version__
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "chaosaddons.controls.bypass",
+        "chaosaddons.controls.cancellation",
+        "chaosaddons.controls.journal",
+        "chaosaddons.controls.limits",
+        "chaosaddons.controls.metrics",
+        "chaosaddons.controls.parallel",
+        "chaosaddons.controls.profiling",
+        "chaosaddons.controls.replay",
+        "chaosaddons.controls.safeguards",
+        "chaosaddons.controls.tracing",
+        "chaosaddons.controls.warmup",
+    ],
+)
+def test_controls_defer_heavy_imports(module):
+    assert loaded_by(module).isdisjoint(HEAVY_MODULES)
@@ -0,0 +1,75 @@
+import json
+
+from chaoslib.experiment import run_experiment
+
+
+def action(name):
+    return {
+        "name": name,
+        "type": "action",
+        "provider": {
+            "type": "python",
+            "module": "json",
+            "func": "dumps",
+            "arguments": {"obj": {"large": "x" * 1000}},
+        },
+    }
+
+
+def test_stream_runs_to_jsonl(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    experiment = {
+        "title": "streaming",
+        "description": "n/a",
+        "steady-state-hypothesis": {
+            "title": "always fine",
+            "probes": [
+                {
+                    "name": "probe",
+                    "type": "probe",
+                    "tolerance": True,
+                    "provider": {
+                        "type": "python",
+                        "module": "os.path",
+                        "func": "exists",
+                        "arguments": {"path": str(tmp_path)},
+                    },
+                }
+            ],
+        },
+        "method": [action("a"), action("b"), action("c")],
+        "controls": [
+            {
+                "name": "journal",
+                "provider": {
+                    "type": "python",
+                    "module": "chaosaddons.controls.journal",
+                    "arguments": {
+                        "path": str(path),
+                        "batch_size": 1,
+                        "drop_persisted_runs": True,
+                    },
+                },
+            }
+        ],
+    }
+
+    journal = run_experiment(experiment)
+    assert journal["status"] == "completed"
+    assert journal["deviated"] is False
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert records[0]["type"] == "experiment-start"
+    assert records[-1]["type"] == "experiment-end"
+    assert records[-1]["status"] == "completed"
+
+    runs = [r["run"] for r in records if r["type"] == "run"]
+    names = [r["activity"]["name"] for r in runs]
+    assert names == ["probe", "a", "b", "c", "probe"]
+    assert all(r["output"] for r in runs)
+
+    # runs written to the file no longer hold their output in memory
+    assert journal["run"][0]["persisted"] is True
+    assert journal["run"][0]["output"] is None
+    assert journal["run"][0]["status"] == "succeeded"
+    assert journal["steady_states"]["before"]["probes"][0]["output"] is True
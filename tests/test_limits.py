@@ -0,0 +1,93 @@
+import time
+
+from chaoslib.activity import run_activity
+from chaoslib.exceptions import ActivityFailed
+import pytest
+
+from chaosaddons.controls.limits import (
+    Limiter,
+    after_activity_control,
+    after_experiment_control,
+    backend_keys,
+    before_activity_control,
+    configure_control,
+    limiters,
+)
+from chaosaddons.controls.safeguards import execute_activity
+
+
+def make_probe(module="os.path"):
+    return {
+        "name": "my-probe",
+        "type": "probe",
+        "provider": {
+            "type": "python",
+            "module": module,
+            "func": "exists",
+            "arguments": {"path": "/tmp"},
+        },
+        "tolerance": True,
+    }
+
+
+def test_token_bucket_spaces_activities():
+    limiter = Limiter("backend", rate=20)
+    start = time.monotonic()
+    for _ in range(3):
+        assert limiter.acquire() is not None
+    assert time.monotonic() - start >= 0.09
+
+
+def test_concurrency_rejects_after_max_wait():
+    limiter = Limiter("backend", concurrency=1, max_wait=0.05)
+    assert limiter.acquire() is not None
+    assert limiter.acquire() is None
+    limiter.release()
+    assert limiter.acquire() is not None
+
+
+def test_backend_keys():
+    http = {
+        "tags": ["metrics"],
+        "provider": {"type": "http", "url": "http://prom.local:9090/api"},
+    }
+    assert backend_keys(http) == ["metrics", "prom.local:9090", "prom.local"]
+    assert backend_keys(make_probe("chaosprometheus.probes")) == [
+        "chaosprometheus.probes",
+        "chaosprometheus",
+    ]
+
+
+def test_rejected_activity_fails_without_running():
+    configure_control(limits={"os": {"concurrency": 1, "max_wait": 0}})
+    try:
+        limiter = limiters.resolve(make_probe())
+        limiter.acquire()
+
+        probe = make_probe()
+        before_activity_control(context=probe)
+        with pytest.raises(ActivityFailed):
+            run_activity(probe, {}, {})
+        run = {"activity": probe.copy(), "status": "failed"}
+        after_activity_control(context=probe, state=run)
+
+        assert run["limits"] == {"key": "os", "rejected": True}
+        assert probe["provider"]["func"] == "exists"
+        assert run["activity"]["provider"]["func"] == "exists"
+    finally:
+        after_experiment_control()
+
+
+def test_safeguards_are_limited():
+    configure_control(limits={"os.path": {"concurrency": 1, "max_wait": 0}})
+    try:
+        run = execute_activity({}, make_probe(), {}, {})
+        assert run["status"] == "succeeded"
+        assert run["limits"]["key"] == "os.path"
+
+        limiters.resolve(make_probe()).acquire()
+        run = execute_activity({}, make_probe(), {}, {})
+        assert run["status"] == "failed"
+        assert run["limits"] == {"key": "os.path", "rejected": True}
+    finally:
+        after_experiment_control()
@@ -0,0 +1,70 @@
+from urllib.request import urlopen
+
+from chaosaddons.controls import metrics
+from chaosaddons.controls.metrics import (
+    Registry,
+    after_experiment_control,
+    configure_control,
+)
+from chaosaddons.controls.safeguards import execute_activity
+
+
+def test_render_openmetrics():
+    r = Registry()
+    c = r.counter("probes", "Probes run", ("probe",))
+    c.labels("a").inc()
+    c.labels("a").inc()
+    h = r.histogram("duration_seconds", "Durations", buckets=(0.1, 1))
+    h.labels().observe(0.05)
+    h.labels().observe(0.5)
+    h.labels().observe(5)
+    r.gauge("depth", "Depth", ("pool",), callback=lambda: {("now",): 3})
+
+    text = r.render()
+    assert "# TYPE probes counter" in text
+    assert 'probes_total{probe="a"} 2.0' in text
+    assert 'duration_seconds_bucket{le="0.1"} 1' in text
+    assert 'duration_seconds_bucket{le="1"} 2' in text
+    assert 'duration_seconds_bucket{le="+Inf"} 3' in text
+    assert "duration_seconds_count 3" in text
+    assert 'depth{pool="now"} 3' in text
+    assert text.endswith("# EOF\n")
+
+
+def test_serve_and_write_metrics(tmp_path):
+    textfile = tmp_path / "chaos.prom"
+    configure_control(port=0, textfile=str(textfile), textfile_interval=60)
+    try:
+        execute_activity(
+            experiment={},
+            probe={
+                "name": "my-probe",
+                "type": "probe",
+                "provider": {
+                    "type": "python",
+                    "module": "os.path",
+                    "func": "exists",
+                    "arguments": {"path": "/tmp"},
+                },
+                "tolerance": True,
+            },
+            configuration={},
+            secrets={},
+        )
+
+        port = metrics._exporter.server.server_address[1]
+        with urlopen("http://127.0.0.1:{}/metrics".format(port)) as r:
+            assert r.headers["Content-Type"].startswith(
+                "application/openmetrics-text"
+            )
+            body = r.read().decode("utf-8")
+    finally:
+        after_experiment_control()
+
+    assert (
+        "chaosaddons_safeguard_probe_executions_total"
+        '{probe="my-probe",status="succeeded"}'
+    ) in body
+    assert "chaosaddons_safeguard_probe_executions_total" in (
+        textfile.read_text()
+    )
@@ -0,0 +1,174 @@
+import threading
+import time
+
+from chaoslib.exit import exit_gracefully, exit_signals
+from chaoslib.experiment import run_experiment
+from chaoslib.run import RunEventHandler
+
+
+def idle_action(name, duration=0.3):
+    return {
+        "name": name,
+        "type": "action",
+        "provider": {
+            "type": "python",
+            "module": "chaosaddons.utils.idle",
+            "func": "idle_for",
+            "arguments": {"duration": duration},
+        },
+    }
+
+
+def failing_action(name):
+    return {
+        "name": name,
+        "type": "action",
+        "provider": {
+            "type": "python",
+            "module": "os.path",
+            "func": "getsize",
+            "arguments": {"filename": "/does/not/exist"},
+        },
+    }
+
+
+def make_experiment(method, **arguments):
+    return {
+        "title": "parallel",
+        "description": "n/a",
+        "method": method,
+        "controls": [
+            {
+                "name": "parallel",
+                "provider": {
+                    "type": "python",
+                    "module": "chaosaddons.controls.parallel",
+                    "arguments": arguments,
+                },
+            }
+        ],
+    }
+
+
+def test_run_group_in_parallel():
+    experiment = make_experiment(
+        [
+            idle_action("a"),
+            idle_action("b"),
+            idle_action("c"),
+            idle_action("d", duration=0),
+        ],
+        groups={"faults": ["a", "b", "c"]},
+    )
+
+    start = time.monotonic()
+    journal = run_experiment(experiment)
+    assert time.monotonic() - start < 0.8
+
+    runs = journal["run"]
+    assert [r["activity"]["name"] for r in runs] == ["a", "b", "c", "d"]
+    assert all(r["status"] == "succeeded" for r in runs)
+    assert runs[0]["parallel"]["group"] == "faults"
+    assert runs[0]["parallel"]["activities"] == ["a", "b", "c"]
+    assert [a["name"] for a in experiment["method"]] == ["a", "b", "c", "d"]
+
+
+def test_first_failure_cancels_pending_activities():
+    experiment = make_experiment(
+        [
+            idle_action("a"),
+            failing_action("b"),
+            idle_action("c"),
+            idle_action("d"),
+        ],
+        groups={"faults": ["a", "b", "c", "d"]},
+        max_workers=2,
+    )
+
+    journal = run_experiment(experiment)
+
+    runs = journal["run"]
+    assert [r["activity"]["name"] for r in runs] == ["a", "b", "c", "d"]
+    assert runs[1]["status"] == "failed"
+    assert runs[0]["parallel"]["cancelled"] == ["c", "d"]
+
+
+def test_non_consecutive_members_run_sequentially():
+    experiment = make_experiment(
+        [
+            idle_action("a", duration=0),
+            idle_action("b", duration=0),
+            idle_action("c", duration=0),
+        ],
+        groups={"faults": ["a", "c"]},
+    )
+
+    journal = run_experiment(experiment)
+    assert [r["activity"]["name"] for r in journal["run"]] == ["a", "b", "c"]
+    assert "parallel" not in journal["run"][0]
+
+
+def test_interruption_cancels_pending_activities():
+    experiment = make_experiment(
+        [
+            idle_action("a", duration=1),
+            idle_action("b", duration=1),
+            idle_action("c", duration=1),
+            idle_action("d", duration=1),
+        ],
+        groups={"faults": ["a", "b", "c", "d"]},
+        max_workers=2,
+        cancel_on_failure=False,
+    )
+
+    timer = threading.Timer(0.3, exit_gracefully)
+    start = time.monotonic()
+    with exit_signals():
+        timer.start()
+        journal = run_experiment(experiment)
+    assert time.monotonic() - start < 1.8
+
+    assert journal["status"] == "interrupted"
+    runs = journal["run"]
+    assert [r["activity"]["name"] for r in runs] == ["a", "b", "c", "d"]
+    assert runs[1]["status"] == "succeeded"
+    assert [r["status"] for r in runs[2:]] == ["failed", "failed"]
+    assert [a["name"] for a in experiment["method"]] == ["a", "b", "c", "d"]
+
+
+def test_single_worker_runs_sequentially():
+    experiment = make_experiment(
+        [idle_action("a", duration=0.2), idle_action("b", duration=0.2)],
+        groups={"faults": ["a", "b"]},
+        max_workers=1,
+    )
+
+    start = time.monotonic()
+    journal = run_experiment(experiment)
+    assert time.monotonic() - start >= 0.4
+    assert [r["activity"]["name"] for r in journal["run"]] == ["a", "b"]
+    assert "parallel" not in journal["run"][0]
+
+
+def test_followers_notify_the_event_handlers():
+    class Handler(RunEventHandler):
+        def __init__(self):
+            self.started = []
+            self.completed = []
+
+        def start_activity(self, activity):
+            self.started.append(activity["name"])
+
+        def activity_completed(self, activity, run):
+            self.completed.append(activity["name"])
+
+    handler = Handler()
+    experiment = make_experiment(
+        [idle_action("a", duration=0), idle_action("b", duration=0)],
+        groups={"faults": ["a", "b"]},
+    )
+    journal = run_experiment(experiment, event_handlers=[handler])
+
+    assert journal["status"] == "completed"
+    assert sorted(handler.started) == ["a", "b"]
+    assert sorted(handler.completed) == ["a", "b"]
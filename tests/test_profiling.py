@@ -0,0 +1,88 @@
+import threading
+import time
+
+from chaosaddons.controls.profiling import (
+    after_activity_control,
+    after_experiment_control,
+    before_activity_control,
+    before_experiment_control,
+)
+from chaosaddons.controls.synchronization import mark_safeguard_thread
+
+
+def busy(duration):
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        pass
+
+
+def test_profile_activity(tmp_path):
+    activity = {"name": "say hello", "type": "action"}
+    run = {}
+
+    before_experiment_control(context={})
+    before_activity_control(
+        context=activity, profiler="sampling", profile_threshold=0.05,
+        profile_dir=str(tmp_path)
+    )
+    busy(0.1)
+    after_activity_control(
+        context=activity, state=run, profiler="sampling",
+        profile_threshold=0.05, profile_dir=str(tmp_path)
+    )
+
+    profile = run["profile"]
+    assert profile["wall"] >= 0.1
+    assert profile["cpu"] > 0
+    assert profile["gc_pauses"] >= 0
+    assert profile["profile_file"].endswith("say_hello-1.collapsed")
+    with open(profile["profile_file"]) as f:
+        assert "busy" in f.read()
+
+    journal = {}
+    after_experiment_control(context={}, state=journal)
+    assert journal["profiling"]["hooks"] == 2
+
+    # the next experiment starts from scratch
+    before_experiment_control(context={})
+    after_experiment_control(context={}, state=journal)
+    assert journal["profiling"] == {"hooks": 0, "overhead": 0.0}
+
+
+def test_short_activities_are_not_profiled(tmp_path):
+    activity = {"name": "fast", "type": "action"}
+    run = {}
+
+    before_activity_control(
+        context=activity, profiler="cprofile", profile_dir=str(tmp_path)
+    )
+    after_activity_control(
+        context=activity, state=run, profiler="cprofile",
+        profile_dir=str(tmp_path)
+    )
+
+    assert "profile_file" not in run["profile"]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_safeguards_are_skipped_by_default():
+    probe = {"name": "safeguard", "type": "probe"}
+    runs = {}
+
+    def run_safeguard(include_safeguards):
+        mark_safeguard_thread()
+        run = runs[include_safeguards] = {}
+        before_activity_control(
+            context=probe, include_safeguards=include_safeguards
+        )
+        after_activity_control(
+            context=probe, state=run, include_safeguards=include_safeguards
+        )
+
+    for include_safeguards in (False, True):
+        t = threading.Thread(target=run_safeguard, args=(include_safeguards,))
+        t.start()
+        t.join()
+
+    assert "profile" not in runs[False]
+    assert "profile" in runs[True]
@@ -0,0 +1,109 @@
+import threading
+
+from chaoslib.activity import run_activity
+
+from chaosaddons.controls.replay import (
+    after_activity_control,
+    before_activity_control,
+)
+from chaosaddons.controls.synchronization import mark_safeguard_thread
+
+
+def make_probe():
+    return {
+        "name": "probe-A",
+        "type": "probe",
+        "provider": {
+            "type": "python",
+            "module": "json",
+            "func": "dumps",
+            "arguments": {"obj": [2, 3]},
+        },
+    }
+
+
+def test_record_then_replay(tmp_path):
+    store_path = str(tmp_path)
+    probe = make_probe()
+
+    before_activity_control(context=probe, mode="record", store_path=store_path)
+    output = run_activity(probe, {}, {})
+    after_activity_control(
+        context=probe,
+        state={"status": "succeeded", "output": output},
+        mode="record",
+        store_path=store_path,
+    )
+    assert output == "[2, 3]"
+
+    # pretend the real system would now answer differently
+    probe = make_probe()
+    before_activity_control(context=probe, mode="replay", store_path=store_path)
+    assert probe["provider"]["func"] == "replay_output"
+
+    state = {"activity": probe.copy(), "status": "succeeded"}
+    state["output"] = run_activity(probe, {}, {})
+    after_activity_control(
+        context=probe, state=state, mode="replay", store_path=store_path
+    )
+
+    assert state["output"] == "[2, 3]"
+    assert state["replayed"] is True
+    assert probe["provider"]["func"] == "dumps"
+    assert state["activity"]["provider"]["func"] == "dumps"
+
+
+def test_replay_runs_activity_when_not_recorded(tmp_path):
+    probe = make_probe()
+    before_activity_control(
+        context=probe, mode="replay", store_path=str(tmp_path)
+    )
+    assert probe["provider"]["func"] == "dumps"
+
+
+def test_failed_runs_are_not_recorded(tmp_path):
+    probe = make_probe()
+    after_activity_control(
+        context=probe,
+        state={"status": "failed", "output": None},
+        mode="record",
+        store_path=str(tmp_path),
+    )
+    assert not (tmp_path / "refs").exists()
+
+
+def test_safeguards_are_not_replayed_by_default(tmp_path):
+    store_path = str(tmp_path)
+    outcome = {}
+
+    def run(include_safeguards):
+        mark_safeguard_thread()
+        probe = make_probe()
+        after_activity_control(
+            context=probe,
+            state={"status": "succeeded", "output": "[2, 3]"},
+            mode="record",
+            store_path=store_path,
+            include_safeguards=include_safeguards,
+        )
+        before_activity_control(
+            context=probe,
+            mode="replay",
+            store_path=store_path,
+            include_safeguards=include_safeguards,
+        )
+        outcome[include_safeguards] = probe["provider"]["func"]
+        after_activity_control(
+            context=probe,
+            state={"status": "succeeded"},
+            mode="replay",
+            store_path=store_path,
+            include_safeguards=include_safeguards,
+        )
+
+    for include_safeguards in (False, True):
+        t = threading.Thread(target=run, args=(include_safeguards,))
+        t.start()
+        t.join()
+
+    assert outcome == {False: "dumps", True: "replay_output"}
@@ -1,7 +1,22 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
 from chaoslib.exceptions import InvalidActivity
+from chaoslib.exit import exit_signals
+from chaoslib.experiment import run_experiment
 import pytest
 
-from chaosaddons.controls.safeguards import validate_control
+from chaosaddons.controls.safeguards import (
+    Guardian,
+    probe_validation_key,
+    validate_control,
+)
+from chaosaddons.controls.synchronization import idle_interrupted
+from chaosaddons.utils.idle import idle_for
 
 
 def test_fail_on_invalid_probes():
@@ -102,3 +117,319 @@ def test_fail_when_no_probes_were_given():
     }
     with pytest.raises(InvalidActivity) as x:
         validate_control(invalid_python_func_probe)
+
+
+def test_validated_probes_are_cached(tmp_path, monkeypatch):
+    from chaoslib import activity
+
+    validated = []
+
+    def ensure_activity_is_valid(probe):
+        validated.append(probe["name"])
+
+    monkeypatch.setattr(
+        activity, "ensure_activity_is_valid", ensure_activity_is_valid
+    )
+
+    probe = {
+        "name": "my probe",
+        "type": "probe",
+        "provider": {
+            "type": "python",
+            "module": "os.path",
+            "func": "exists",
+            "arguments": {"path": "/tmp"},
+        },
+        "tolerance": True,
+    }
+    control = {
+        "name": "my control",
+        "provider": {
+            "type": "python",
+            "module": "chaosaddons.controls.safeguards",
+            "arguments": {
+                "probes": [probe],
+                "validation_cache_path": str(tmp_path / "cache.json"),
+            },
+        },
+    }
+
+    validate_control(control)
+    assert validated == ["my probe"]
+
+    validate_control(control)
+    assert validated == ["my probe"]
+
+    probe["tolerance"] = False
+    validate_control(control)
+    assert validated == ["my probe", "my probe"]
+
+    control["provider"]["arguments"]["validation_cache"] = False
+    validate_control(control)
+    assert validated == ["my probe", "my probe", "my probe"]
+
+
+def test_validation_cache_follows_the_provider_module(tmp_path, monkeypatch):
+    package = tmp_path / "safeguardprobes"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    module = package / "checks.py"
+    module.write_text("def check():\n    return True\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    control = {
+        "name": "my control",
+        "provider": {
+            "type": "python",
+            "module": "chaosaddons.controls.safeguards",
+            "arguments": {
+                "probes": [
+                    {
+                        "name": "my probe",
+                        "type": "probe",
+                        "provider": {
+                            "type": "python",
+                            "module": "safeguardprobes.checks",
+                            "func": "check",
+                        },
+                        "tolerance": True,
+                    }
+                ],
+                "validation_cache_path": str(tmp_path / "cache.json"),
+            },
+        },
+    }
+    validate_control(control)
+
+    # a new release of the package, only changing the provider's module
+    for name in ("safeguardprobes.checks", "safeguardprobes"):
+        monkeypatch.delitem(sys.modules, name)
+    module.write_text("def other():\n    return True\n")
+    mtime = os.stat(module).st_mtime_ns + 10**9
+    os.utime(module, ns=(mtime, mtime))
+
+    with pytest.raises(InvalidActivity):
+        validate_control(control)
+
+
+def test_fail_on_invalid_output_policy():
+    control = {
+        "name": "my control",
+        "provider": {
+            "type": "python",
+            "module": "chaosaddons.controls.safeguards",
+            "arguments": {
+                "validation_cache": False,
+                "probes": [
+                    {
+                        "name": "my probe",
+                        "type": "probe",
+                        "provider": {
+                            "type": "python",
+                            "module": "os.path",
+                            "func": "exists",
+                            "arguments": {"path": "/tmp"},
+                        },
+                        "tolerance": True,
+                        "output_policy": {"type": "jsonpath"},
+                    }
+                ],
+            },
+        },
+    }
+    with pytest.raises(InvalidActivity) as x:
+        validate_control(control)
+    assert "needs a path" in str(x.value)
+
+
+def test_tolerance_is_checked_before_the_output_is_bounded():
+    from chaosaddons.controls.safeguards import probe_is_healthy
+
+    output = "x" * 10000
+    probe = {
+        "name": "my probe",
+        "type": "probe",
+        "tolerance": {"type": "regex", "pattern": "x{10000}"},
+        "output_policy": {"type": "truncate", "max_bytes": 10},
+    }
+    run = {"output": output, "status": "succeeded"}
+
+    assert probe_is_healthy(probe, run, None, None) is True
+    assert run["output"] == "xxxxxxxxxx"
+    assert run["output_bounded"] == {
+        "policy": "truncate",
+        "size": 10000,
+        "truncated": True,
+    }
+
+
+def test_digest_output_policy():
+    from chaosaddons.controls.safeguards import bound_output
+
+    output = {"items": list(range(1000))}
+    probe = {
+        "name": "my probe",
+        "tolerance": True,
+        "output_policy": {"type": "digest", "excerpt_bytes": 20},
+    }
+    run = {"output": output}
+    bound_output(probe, run)
+
+    data = json.dumps(output, separators=(",", ":")).encode("utf-8")
+    assert run["output"]["sha256"] == hashlib.sha256(data).hexdigest()
+    assert run["output"]["size"] == len(data)
+    assert run["output"]["excerpt"] == '{"items":[...,998,999]}'
+
+
+def test_jsonpath_output_policy_keeps_what_the_tolerance_reads():
+    pytest.importorskip("jsonpath2")
+    from chaosaddons.controls.safeguards import bound_output
+
+    probe = {
+        "name": "my probe",
+        "tolerance": {
+            "type": "jsonpath",
+            "path": "$.result[*].value",
+            "expect": [1, 1],
+        },
+        "output_policy": {"type": "jsonpath"},
+    }
+    run = {
+        "output": json.dumps(
+            {
+                "result": [
+                    {"value": 1, "metric": "a" * 1000},
+                    {"value": 1, "metric": "b" * 1000},
+                ]
+            }
+        )
+    }
+    bound_output(probe, run)
+
+    assert run["output"] == [1, 1]
+    assert run["output_bounded"] == {"policy": "jsonpath"}
+
+
+def test_only_pools_with_probes_are_created():
+    guard = Guardian()
+    guard.prepare([{"name": "p", "type": "probe", "frequency": 1}])
+    try:
+        assert guard.now is None
+        assert guard.once is None
+        assert guard.repeating is not None
+    finally:
+        guard.repeating.shutdown()
+
+
+def idle_activity(name, duration):
+    return {
+        "name": name,
+        "type": "action",
+        "provider": {
+            "type": "python",
+            "module": "chaosaddons.utils.idle",
+            "func": "idle_for",
+            "arguments": {"duration": duration},
+        },
+    }
+
+
+def test_interruption_only_cuts_the_method_pauses_short():
+    probe = idle_activity("late", 0.2)
+    probe.update({"type": "probe", "background": True, "tolerance": True})
+    experiment = {
+        "title": "interrupted",
+        "description": "n/a",
+        "method": [idle_activity("pause", 5)],
+        "rollbacks": [idle_activity("recover", 0.3)],
+        "controls": [
+            {
+                "name": "safeguards",
+                "provider": {
+                    "type": "python",
+                    "module": "chaosaddons.controls.safeguards",
+                    "arguments": {"validation_cache": False, "probes": [probe]},
+                },
+            }
+        ],
+    }
+    settings = {"runtime": {"rollbacks": {"strategy": "always"}}}
+
+    with exit_signals():
+        journal = run_experiment(experiment, settings=settings)
+    assert journal["status"] == "interrupted"
+    assert journal["rollbacks"][0]["duration"] >= 0.3
+    assert not idle_interrupted.is_set()
+
+    # the next experiment is not interrupted
+    start = time.monotonic()
+    idle_for(0.1)
+    assert time.monotonic() - start >= 0.1
+
+
+def test_repeating_safeguard_interrupts_on_its_first_failure():
+    exited = threading.Event()
+
+    class ExitRecorder(Guardian):
+        def _exit(self):
+            exited.set()
+
+    probe = {
+        "name": "missing",
+        "type": "probe",
+        "frequency": 5,
+        "provider": {
+            "type": "python",
+            "module": "os.path",
+            "func": "exists",
+            "arguments": {"path": "/does/not/exist"},
+        },
+        "tolerance": True,
+    }
+    guard = ExitRecorder()
+    guard.prepare([probe])
+    start = time.perf_counter()
+    guard.run({}, [probe], {}, {}, {})
+    try:
+        # not a full frequency later
+        assert exited.wait(timeout=1)
+        assert start < guard.triggered_at < time.perf_counter()
+    finally:
+        guard.terminate()
+
+
+def test_validation_cache_follows_the_process_executable(tmp_path, monkeypatch):
+    first = tmp_path / "first"
+    second = tmp_path / "second"
+    for directory in (first, second):
+        directory.mkdir()
+        executable = directory / "check"
+        executable.write_text("#!/bin/sh\nexit 0\n")
+        executable.chmod(0o755)
+    monkeypatch.setenv("PATH", "{}:{}".format(second, os.environ["PATH"]))
+
+    control = {
+        "name": "my control",
+        "provider": {
+            "type": "python",
+            "module": "chaosaddons.controls.safeguards",
+            "arguments": {
+                "probes": [
+                    {
+                        "name": "my probe",
+                        "type": "probe",
+                        "provider": {"type": "process", "path": "check"},
+                        "tolerance": 0,
+                    }
+                ],
+                "validation_cache_path": str(tmp_path / "cache.json"),
+            },
+        },
+    }
+    validate_control(control)
+    probe = control["provider"]["arguments"]["probes"][0]
+    key = probe_validation_key(probe)
+
+    # another executable now comes first in the PATH
+    monkeypatch.setenv("PATH", "{}:{}".format(first, os.environ["PATH"]))
+    assert probe_validation_key(probe) != key
@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+import json
+import threading
+
+from chaosaddons.controls import tracing
+from chaosaddons.controls.synchronization import mark_safeguard_thread
+
+
+def run_experiment(trace_path, trace_format):
+    experiment = {"title": "my experiment"}
+    activity = {
+        "name": "say-hello",
+        "type": "action",
+        "provider": {"type": "python", "module": "os", "func": "getcwd"},
+    }
+    probe = {"name": "safeguard", "type": "probe"}
+
+    def safeguard():
+        mark_safeguard_thread()
+        tracing.before_activity_control(context=probe)
+        tracing.after_activity_control(context=probe, state={})
+
+    tracing.before_experiment_control(context=experiment)
+    tracing.before_method_control(context=experiment)
+    tracing.before_activity_control(context=activity)
+    start = datetime.now(timezone.utc).isoformat()
+    t = threading.Thread(target=safeguard)
+    t.start()
+    t.join()
+    end = datetime.now(timezone.utc).isoformat()
+    tracing.after_activity_control(
+        context=activity,
+        state={"status": "succeeded", "start": start, "end": end},
+    )
+    tracing.after_method_control(context=experiment)
+    tracing.after_experiment_control(
+        context=experiment,
+        state={"status": "completed"},
+        trace_path=trace_path,
+        trace_format=trace_format,
+    )
+
+    with open(trace_path) as f:
+        return json.load(f)
+
+
+def test_chrome_trace(tmp_path):
+    trace = run_experiment(str(tmp_path / "trace.json"), "chrome")
+
+    spans = {e["name"]: e for e in trace["traceEvents"] if e["ph"] == "X"}
+    assert set(spans) == {
+        "my experiment",
+        "method",
+        "say-hello",
+        "getcwd",
+        "safeguard",
+    }
+    assert spans["my experiment"]["ts"] == 0
+    assert spans["method"]["ts"] <= spans["say-hello"]["ts"]
+    assert spans["safeguard"]["tid"] != spans["say-hello"]["tid"]
+
+    names = {e["args"]["name"] for e in trace["traceEvents"] if e["ph"] == "M"}
+    assert names == {"main", "safeguards"}
+
+
+def test_otlp_trace(tmp_path):
+    trace = run_experiment(str(tmp_path / "trace.json"), "otlp")
+
+    spans = trace["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    by_name = {s["name"]: s for s in spans}
+    root = by_name["my experiment"]
+    assert "parentSpanId" not in root
+    assert by_name["method"]["parentSpanId"] == root["spanId"]
+    assert by_name["say-hello"]["parentSpanId"] == by_name["method"]["spanId"]
+    assert by_name["getcwd"]["parentSpanId"] == by_name["say-hello"]["spanId"]
+    assert by_name["safeguard"]["parentSpanId"] == root["spanId"]
+    assert len({s["traceId"] for s in spans}) == 1
@@ -0,0 +1,104 @@
+from chaoslib.exceptions import InvalidActivity
+import pytest
+
+from chaosaddons.controls.warmup import (
+    after_experiment_control,
+    configure_control,
+    validate_control,
+)
+
+
+def test_warmup_providers_and_hooks():
+    experiment = {
+        "method": [
+            {
+                "name": "a",
+                "type": "action",
+                "provider": {
+                    "type": "python",
+                    "module": "json",
+                    "func": "dumps",
+                },
+            },
+            {
+                "name": "b",
+                "type": "action",
+                "provider": {
+                    "type": "python",
+                    "module": "nope.not.here",
+                    "func": "f",
+                },
+            },
+        ],
+        "controls": [
+            {
+                "name": "safeguard",
+                "provider": {
+                    "type": "python",
+                    "module": "chaosaddons.controls.safeguards",
+                    "arguments": {
+                        "probes": [
+                            {
+                                "name": "c",
+                                "type": "probe",
+                                "provider": {
+                                    "type": "python",
+                                    "module": "os.path",
+                                    "func": "exists",
+                                },
+                            }
+                        ]
+                    },
+                },
+            }
+        ],
+    }
+
+    configure_control(
+        experiment=experiment,
+        hooks=[{"module": "os", "func": "getcwd"}],
+    )
+    journal = {}
+    after_experiment_control(context=experiment, state=journal)
+
+    report = journal["warmup"]
+    assert set(report["providers"]) == {
+        "python:json:dumps",
+        "python:os.path:exists",
+    }
+    assert set(report["hooks"]) == {"os.getcwd"}
+    assert len(report["failures"]) == 1
+    assert report["failures"][0].startswith("python:nope.not.here:f")
+    assert report["duration"] >= 0
+
+
+def test_warmup_hooks_must_be_complete():
+    control = {
+        "name": "warmup",
+        "provider": {
+            "type": "python",
+            "module": "chaosaddons.controls.warmup",
+            "arguments": {"hooks": [{"module": "os"}]},
+        },
+    }
+    with pytest.raises(InvalidActivity):
+        validate_control(control)
+
+
+def test_warmup_hook_arguments_are_substituted(tmp_path):
+    configure_control(
+        configuration={"root": str(tmp_path)},
+        secrets={"store": {"name": "secret-dir"}},
+        hooks=[
+            {
+                "module": "os",
+                "func": "makedirs",
+                "arguments": {"name": "${root}/${name}"},
+            }
+        ],
+    )
+    journal = {}
+    after_experiment_control(context={}, state=journal)
+
+    assert journal["warmup"]["failures"] == []
+    assert (tmp_path / "secret-dir").is_dir()